@@ -1,8 +1,14 @@
+import contextlib
+import functools
+import logging
 import os
 import sqlite3
+import threading
 from pathlib import Path
 from .config import DB_PATH
 
+logger = logging.getLogger(__name__)
+
 # =============================================================================
 # EVENT SOURCING MIGRATION FLAG
 # =============================================================================
@@ -23,8 +29,126 @@ try:
 except PermissionError:
     pass
 
-# Initialize DB and table
-conn = sqlite3.connect(DB_PATH, check_same_thread=False)
+# Initialize DB and table. The services keep their SQL text stable (module
+# constants / lru_cache'd builders), so a larger statement cache keeps every
+# shape prepared instead of cycling through the default 128 slots.
+# isolation_level="IMMEDIATE" makes the implicit transaction opened by the first
+# write in a `with conn:` block a BEGIN IMMEDIATE, so the write lock is taken up
+# front (waiting on busy_timeout) instead of upgrading mid-transaction and
+# failing with SQLITE_BUSY when another process holds it.
+STATEMENT_CACHE_SIZE = 256
+conn = sqlite3.connect(
+    DB_PATH,
+    check_same_thread=False,
+    cached_statements=STATEMENT_CACHE_SIZE,
+    isolation_level="IMMEDIATE",
+)
+
+# WAL lets exports/stats read while inserts proceed. With synchronous=NORMAL the
+# database stays consistent after any crash; only the most recent commits can be
+# rolled back on power loss / OS crash (an app crash loses nothing committed).
+conn.execute("PRAGMA journal_mode=WAL")
+conn.execute("PRAGMA synchronous=NORMAL")
+conn.execute("PRAGMA temp_store=MEMORY")
+conn.execute("PRAGMA mmap_size=268435456")
+conn.execute("PRAGMA cache_size=-65536")
+conn.execute("PRAGMA busy_timeout=5000")
+
+# `conn` is shared by every worker thread and sqlite3 transactions are
+# per-connection, so concurrent writers would share (and commit) each other's
+# transaction. Every service function that writes through conn holds write_lock
+# (with_write_lock, or `with write_lock, conn:` in the async upload handlers);
+# read-only paths use get_read_conn().
+write_lock = threading.RLock()
+_read_local = threading.local()
+_batch_local = threading.local()
+
+
+def with_write_lock(func):
+    """Run func while holding write_lock (re-entrant, so nested writes are fine)."""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with write_lock:
+            return func(*args, **kwargs)
+    return wrapper
+
+
+@contextlib.contextmanager
+def write_transaction():
+    """`with conn:` that defers to an enclosing batch_transaction() on this thread."""
+    if getattr(_batch_local, "active", False):
+        yield conn
+    else:
+        with conn:
+            yield conn
+
+
+@contextlib.contextmanager
+def batch_transaction():
+    """Run many writes under write_lock in a single transaction.
+
+    write_transaction() blocks and commit_writes() calls inside it don't commit;
+    the whole batch commits on exit or rolls back if anything raises.
+    """
+    with write_lock:
+        if getattr(_batch_local, "active", False):
+            yield conn
+            return
+        _batch_local.active = True
+        try:
+            with conn:
+                if not conn.in_transaction:
+                    conn.execute("BEGIN IMMEDIATE")
+                yield conn
+        finally:
+            _batch_local.active = False
+
+
+def commit_writes() -> None:
+    """Commit the writer connection unless a batch_transaction() is open on this thread."""
+    if not getattr(_batch_local, "active", False):
+        conn.commit()
+
+
+def _connect_reader() -> sqlite3.Connection:
+    read_conn = sqlite3.connect(DB_PATH, check_same_thread=False, cached_statements=STATEMENT_CACHE_SIZE)
+    read_conn.execute("PRAGMA query_only=1")
+    read_conn.execute("PRAGMA temp_store=MEMORY")
+    read_conn.execute("PRAGMA mmap_size=268435456")
+    read_conn.execute("PRAGMA busy_timeout=5000")
+    return read_conn
+
+
+def get_read_conn() -> sqlite3.Connection:
+    """Return this thread's read-only connection (WAL readers don't wait on the writer).
+
+    Only for statements that are fully fetched before returning; a cursor left
+    open pins this connection's WAL snapshot for every later read on the thread.
+    """
+    if DB_PATH == ":memory:":
+        # Every connection to :memory: is a separate database
+        return conn
+    read_conn = getattr(_read_local, "conn", None)
+    if read_conn is None:
+        read_conn = _connect_reader()
+        _read_local.conn = read_conn
+    return read_conn
+
+
+def open_read_conn() -> sqlite3.Connection:
+    """Open a private read-only connection for a cursor that outlives the call (streamed exports).
+
+    Pass it to release_read_conn() once the rows are consumed or abandoned.
+    """
+    if DB_PATH == ":memory:":
+        return conn
+    return _connect_reader()
+
+
+def release_read_conn(read_conn: sqlite3.Connection) -> None:
+    """Close a connection from open_read_conn(), ending its read snapshot."""
+    if read_conn is not conn:
+        read_conn.close()
 
 # Create animal_types lookup table
 conn.execute(
@@ -986,3 +1110,195 @@ def migrate_add_animal_idv():
 migrate_add_animal_idv()
 
 
+def migrate_add_registration_tenant_indexes():
+    """Add tenant-prefixed composite indexes used by date-filtered exports"""
+    try:
+        # Exports filter by tenant column first, then date(born_date) (so values
+        # stored with a time part still match); indexing that expression lets
+        # SQLite narrow by both in a single range scan.
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_reg_company_born_day ON registrations(company_id, date(born_date))")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_reg_createdby_born_day ON registrations(created_by, date(born_date))")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_reg_userkey_born_day ON registrations(user_key, date(born_date))")
+        # Superseded bare-column indexes: the date(born_date) predicate can't use them
+        for index in ("idx_reg_company_born", "idx_reg_createdby_born", "idx_reg_userkey_born"):
+            conn.execute(f"DROP INDEX IF EXISTS {index}")
+        conn.commit()
+        print("Registration tenant indexes migration completed successfully")
+    except sqlite3.Error as e:
+        print(f"Registration tenant indexes migration error: {e}")
+
+migrate_add_registration_tenant_indexes()
+
+
+# Bump when the registration_stats triggers change: the next startup recreates
+# them and rebuilds the table once. Otherwise the triggers keep it current and
+# startup leaves it alone.
+REGISTRATION_STATS_VERSION = 1
+
+
+def migrate_add_registration_stats():
+    """Create the registration_stats summary table and keep it in sync with triggers.
+
+    Rows are bucketed by (company_id, gender, animal_type, date(created_at)) so the
+    stats endpoint can read small pre-aggregated rows instead of scanning registrations.
+    NULL gender/animal_type/date are stored as '' / 0 / '' so the upsert key stays unique.
+    The table is backfilled only when it is first created or REGISTRATION_STATS_VERSION
+    changes (the version is part of the trigger names).
+    """
+    suffix = f"_v{REGISTRATION_STATS_VERSION}"
+    triggers = {
+        f"registration_stats_insert{suffix}": f"""
+            CREATE TRIGGER registration_stats_insert{suffix}
+            AFTER INSERT ON registrations
+            FOR EACH ROW WHEN NEW.company_id IS NOT NULL
+            BEGIN
+                INSERT INTO registration_stats (company_id, gender, animal_type, bucket_date, count)
+                VALUES (NEW.company_id, IFNULL(NEW.gender, ''), IFNULL(NEW.animal_type, 0), IFNULL(date(NEW.created_at), ''), 1)
+                ON CONFLICT(company_id, gender, animal_type, bucket_date) DO UPDATE SET count = count + 1;
+            END;
+        """,
+        f"registration_stats_delete{suffix}": f"""
+            CREATE TRIGGER registration_stats_delete{suffix}
+            AFTER DELETE ON registrations
+            FOR EACH ROW WHEN OLD.company_id IS NOT NULL
+            BEGIN
+                UPDATE registration_stats SET count = count - 1
+                WHERE company_id = OLD.company_id
+                  AND gender = IFNULL(OLD.gender, '')
+                  AND animal_type = IFNULL(OLD.animal_type, 0)
+                  AND bucket_date = IFNULL(date(OLD.created_at), '');
+            END;
+        """,
+        f"registration_stats_update{suffix}": f"""
+            CREATE TRIGGER registration_stats_update{suffix}
+            AFTER UPDATE OF company_id, gender, animal_type, created_at ON registrations
+            FOR EACH ROW WHEN OLD.company_id IS NOT NEW.company_id
+                OR OLD.gender IS NOT NEW.gender
+                OR OLD.animal_type IS NOT NEW.animal_type
+                OR OLD.created_at IS NOT NEW.created_at
+            BEGIN
+                UPDATE registration_stats SET count = count - 1
+                WHERE OLD.company_id IS NOT NULL
+                  AND company_id = OLD.company_id
+                  AND gender = IFNULL(OLD.gender, '')
+                  AND animal_type = IFNULL(OLD.animal_type, 0)
+                  AND bucket_date = IFNULL(date(OLD.created_at), '');
+
+                INSERT INTO registration_stats (company_id, gender, animal_type, bucket_date, count)
+                SELECT NEW.company_id, IFNULL(NEW.gender, ''), IFNULL(NEW.animal_type, 0), IFNULL(date(NEW.created_at), ''), 1
+                WHERE NEW.company_id IS NOT NULL
+                ON CONFLICT(company_id, gender, animal_type, bucket_date) DO UPDATE SET count = count + 1;
+            END;
+        """,
+    }
+    try:
+        table_exists = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'registration_stats'"
+        ).fetchone() is not None
+        existing_triggers = {
+            name for (name,) in conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'trigger' AND name LIKE 'registration_stats_%'"
+            )
+        }
+        if table_exists and existing_triggers == set(triggers):
+            logger.debug("Registration stats are up to date (version %s)", REGISTRATION_STATS_VERSION)
+            return
+
+        with conn:
+            # DDL doesn't open sqlite3's implicit transaction; make the rebuild atomic
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS registration_stats (
+                    company_id INTEGER NOT NULL,
+                    gender TEXT NOT NULL DEFAULT '',
+                    animal_type INTEGER NOT NULL DEFAULT 0,
+                    bucket_date TEXT NOT NULL DEFAULT '',
+                    count INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (company_id, gender, animal_type, bucket_date)
+                )
+            """)
+            for name in existing_triggers:
+                conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+            for statement in triggers.values():
+                conn.execute(statement)
+
+            # Count the rows written before these triggers existed
+            conn.execute("DELETE FROM registration_stats")
+            conn.execute("""
+                INSERT INTO registration_stats (company_id, gender, animal_type, bucket_date, count)
+                SELECT company_id, IFNULL(gender, ''), IFNULL(animal_type, 0), IFNULL(date(created_at), ''), COUNT(*)
+                FROM registrations
+                WHERE company_id IS NOT NULL
+                GROUP BY 1, 2, 3, 4
+            """)
+        logger.info("Registration stats rebuilt (version %s)", REGISTRATION_STATS_VERSION)
+    except sqlite3.Error as e:
+        logger.error("Registration stats migration error: %s", e)
+
+migrate_add_registration_stats()
+
+
+def migrate_add_registration_lookup_indexes():
+    """Add covering indexes for the animal lookups used by update/delete/find"""
+    try:
+        # update/delete/find_and_update (and mother lookups) resolve a row by
+        # company_id + animal_number [+ created_at]; the rowid rides along in the
+        # index, so the id comes back without touching the table.
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_reg_company_animal_created ON registrations(company_id, animal_number, created_at)")
+        # find_and_update_registration's access-denied diagnostic looks the row
+        # up by animal_number + created_at across companies
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_reg_animal_created ON registrations(animal_number, created_at)")
+        conn.commit()
+        print("Registration lookup indexes migration completed successfully")
+    except sqlite3.Error as e:
+        print(f"Registration lookup indexes migration error: {e}")
+
+migrate_add_registration_lookup_indexes()
+
+def migrate_add_round_lookup_indexes():
+    """Add (company_id, insemination_round_id) indexes for insemination round auto-assignment"""
+    try:
+        # _lookup_round_id filters both tables by company_id and matches the round
+        # id (= or LIKE 'YYYY%'); with the round id in the index the match is
+        # checked without visiting the table.
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_ins_ids_co_round ON inseminations_ids(company_id, insemination_round_id DESC)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_ins_co_round ON inseminations(company_id, insemination_round_id DESC)")
+        conn.commit()
+        print("Round lookup indexes migration completed successfully")
+    except sqlite3.Error as e:
+        print(f"Round lookup indexes migration error: {e}")
+
+migrate_add_round_lookup_indexes()
+
+def migrate_add_domain_events_number_index():
+    """Add a (company_id, animal_number, event_time) index on domain_events"""
+    try:
+        # Mothers/fathers are addressed by animal_number: the has-events probe in
+        # ensure_animal_has_events, the by-number event reads and snapshot
+        # projections all filter on company_id + animal_number and order by
+        # event_time, which otherwise scan every event of the company.
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_domain_events_company_number ON domain_events(company_id, animal_number, event_time)")
+        conn.commit()
+        print("Domain events number index migration completed successfully")
+    except sqlite3.Error as e:
+        print(f"Domain events number index migration error: {e}")
+
+migrate_add_domain_events_number_index()
+
+def migrate_add_export_stats_indexes():
+    """Add covering/date indexes for the stats fallback scan and dated snapshot exports"""
+    try:
+        # The stats fallback groups a company's registrations by gender/animal_type
+        # and counts recent created_at values: all four columns in the index make
+        # it an index-only scan with the GROUP BY served in index order.
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_reg_company_stats ON registrations(company_id, gender, animal_type, created_at)")
+        # Dated exports filter snapshots by company_id + date(birth_date) (the
+        # registrations side already has idx_reg_company_born_day).
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_snapshots_company_birth_day ON animal_snapshots(company_id, date(birth_date))")
+        conn.execute("DROP INDEX IF EXISTS idx_snapshots_company_birth")
+        conn.commit()
+        print("Export/stats indexes migration completed successfully")
+    except sqlite3.Error as e:
+        print(f"Export/stats indexes migration error: {e}")
+
+migrate_add_export_stats_indexes()
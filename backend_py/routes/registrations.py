@@ -1,12 +1,16 @@
 from fastapi import APIRouter, Header, HTTPException, Response, Request, UploadFile, File, Query
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+from typing import Iterable, Iterator
 import csv
 import io
+import json
 from ..config import VALID_KEYS, ADMIN_SECRET
 from ..models import RegisterBody, DeleteBody, UpdateBody, UpdateAnimalByNumberBody
 from ..services.registrations import (
-    insert_registration, delete_registration as svc_delete, update_registration, export_rows,
+    insert_registration, insert_registrations_bulk, delete_registration as svc_delete, update_registration, export_rows,
     get_registrations_multi_tenant, export_rows_multi_tenant, get_registration_stats_multi_tenant,
-    update_animal_by_number
+    update_animal_by_number, EXPORT_COLUMNS, normalize_animal_number
 )
 from ..services.firebase_auth import verify_bearer_id_token
 from ..services.auth_service import authenticate_user
@@ -14,6 +18,61 @@ from ..services.registrations_upload import upload_registrations_from_file
 
 router = APIRouter()
 
+def _stream_csv(rows: Iterable[tuple]) -> Iterator[str]:
+    """Write export rows as CSV chunks without materializing the whole result."""
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(EXPORT_COLUMNS)
+    for row in rows:
+        writer.writerow(row)
+        if buf.tell() >= 65536:
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+    yield buf.getvalue()
+
+
+# json.dumps(..., default=str) builds a new JSONEncoder per call; reuse one.
+_encode_json = json.JSONEncoder(default=str).encode
+
+
+def _stream_json(rows: Iterable[tuple]) -> Iterator[str]:
+    """Write export rows as {"items": [...], "count": N} chunks without materializing the whole result."""
+    count = 0
+    parts = ['{"items": [']
+    size = 0
+    for row in rows:
+        item = _encode_json(dict(zip(EXPORT_COLUMNS, row)))
+        parts.append("," + item if count else item)
+        count += 1
+        size += len(item)
+        if size >= 65536:
+            yield "".join(parts)
+            parts.clear()
+            size = 0
+    parts.append(f'], "count": {count}}}')
+    yield "".join(parts)
+
+
+def _json_response(payload) -> Response:
+    """Serialize plain-JSON service output directly, skipping FastAPI's jsonable_encoder pass."""
+    return Response(content=_encode_json(payload), media_type="application/json")
+
+
+def _export_response(rows: Iterable[tuple], format: str) -> StreamingResponse:
+    # Close the rows (releasing the export's read connection) once the response
+    # ends, even when the client disconnects before the body starts streaming
+    close = getattr(rows, "close", None)
+    background = BackgroundTask(close) if close else None
+    if (format or "").lower() == "csv":
+        return StreamingResponse(
+            _stream_csv(rows),
+            media_type="text/csv",
+            headers={"Content-Disposition": "attachment; filename=export.csv"},
+            background=background,
+        )
+    return StreamingResponse(_stream_json(rows), media_type="application/json", background=background)
+
 @router.post("/register", status_code=201)
 def register(body: RegisterBody, request: Request, x_user_key: str | None = Header(default=None)):
     # Try new authentication first (creates user automatically)
@@ -31,6 +90,20 @@ def register(body: RegisterBody, request: Request, x_user_key: str | None = Head
         record_id = insert_registration(x_user_key, body, None)
         return {"ok": True, "id": record_id}
 
+@router.post("/register/bulk", status_code=201)
+def register_bulk(bodies: list[RegisterBody], request: Request, x_user_key: str | None = Header(default=None)):
+    """Register many animals in one request; the batch is validated up front."""
+    user, company_id = authenticate_user(request)
+    if user:
+        user_id = user.get('firebase_uid')
+    else:
+        # Fallback to legacy key if token missing
+        if not x_user_key or x_user_key not in VALID_KEYS:
+            raise HTTPException(status_code=401, detail="Unauthorized")
+        user_id, company_id = x_user_key, None
+    record_ids = insert_registrations_bulk(user_id, bodies, company_id)
+    return {"ok": True, "ids": record_ids, "count": len(record_ids)}
+
 @router.put("/register/update-by-number")
 def update_animal_by_number_endpoint(body: UpdateAnimalByNumberBody, request: Request, x_user_key: str | None = Header(default=None)):
     """Update an animal by animal_number only. Used for mothers/fathers that don't have registration records."""
@@ -97,7 +170,7 @@ def update_registration_by_identifier(body: UpdateBody, request: Request, x_user
             return {"ok": True}
         
         # Fallback: Check if animal exists in snapshots (mother/father)
-        animal_number = body.animalNumber.upper().strip() if body.animalNumber else None
+        animal_number = normalize_animal_number(body.animalNumber)
         if animal_number:
             snapshot = get_snapshot_by_number(animal_number, company_id)
             if snapshot:
@@ -187,19 +260,7 @@ def export_records(request: Request, x_user_key: str | None = Header(default=Non
         if not x_user_key or x_user_key not in VALID_KEYS:
             raise HTTPException(status_code=401, detail="Unauthorized")
     rows = export_rows(user_id or x_user_key, date, start, end)
-    if (format or "").lower() == "csv":
-        buf = io.StringIO()
-        if rows:
-            cols = list(rows[0].keys())
-        else:
-            cols = ["animal_number","born_date","mother_id","weight","gender","status","color","notes","notes_mother","created_at"]
-        writer = csv.DictWriter(buf, fieldnames=cols)
-        writer.writeheader()
-        for row in rows:
-            writer.writerow(row)
-        csv_data = buf.getvalue()
-        return Response(content=csv_data, media_type="text/csv", headers={"Content-Disposition": "attachment; filename=export.csv"})
-    return {"count": len(rows), "items": rows}
+    return _export_response(rows, format)
 
 
 # Multi-tenant endpoints
@@ -211,7 +272,7 @@ def get_registrations(request: Request, limit: int = 100):
         raise HTTPException(status_code=401, detail="Unauthorized")
     
     registrations = get_registrations_multi_tenant(user, limit)
-    return {"registrations": registrations, "count": len(registrations)}
+    return _json_response({"registrations": registrations, "count": len(registrations)})
 
 
 @router.get("/stats")
@@ -222,7 +283,7 @@ def get_registration_stats(request: Request):
         raise HTTPException(status_code=401, detail="Unauthorized")
     
     stats = get_registration_stats_multi_tenant(user)
-    return stats
+    return _json_response(stats)
 
 
 @router.get("/export-multi-tenant")
@@ -239,21 +300,7 @@ def export_registrations_multi_tenant(
         raise HTTPException(status_code=401, detail="Unauthorized")
     
     rows = export_rows_multi_tenant(user, date, start, end)
-    
-    if (format or "").lower() == "csv":
-        buf = io.StringIO()
-        if rows:
-            cols = list(rows[0].keys())
-        else:
-            cols = ["animal_number","born_date","mother_id","weight","gender","status","color","notes","notes_mother","created_at"]
-        writer = csv.DictWriter(buf, fieldnames=cols)
-        writer.writeheader()
-        for row in rows:
-            writer.writerow(row)
-        csv_data = buf.getvalue()
-        return Response(content=csv_data, media_type="text/csv", headers={"Content-Disposition": "attachment; filename=export.csv"})
-    
-    return {"count": len(rows), "items": rows}
+    return _export_response(rows, format)
 
 
 @router.post("/upload")
@@ -1,7 +1,9 @@
 import sqlite3
 from fastapi import HTTPException
-from ..db import conn
+from ..db import conn, with_write_lock
+from .registrations import invalidates_round_cache
 
+@with_write_lock
 def delete_all(user_identifier: str | None = None) -> None:
     try:
         with conn:
@@ -13,6 +15,8 @@ def delete_all(user_identifier: str | None = None) -> None:
     except sqlite3.Error as e:
         raise HTTPException(status_code=500, detail=f"DB error: {e}")
 
+@with_write_lock
+@invalidates_round_cache
 def exec_sql(sql: str, params: tuple) -> dict:
     try:
         cur = conn.execute(sql, params)
@@ -27,6 +31,8 @@ def exec_sql(sql: str, params: tuple) -> dict:
     except sqlite3.Error as e:
         raise HTTPException(status_code=400, detail=f"SQL error: {e}")
 
+@with_write_lock
+@invalidates_round_cache
 def migrate_legacy_data(company_id: int) -> dict:
     """Migrate legacy data (company_id = NULL) to specified company"""
     try:
@@ -6,9 +6,11 @@ Handles company CRUD operations and data access control
 import sqlite3
 from typing import Optional, Dict, List
 from fastapi import HTTPException
-from ..db import conn
+from ..db import conn, with_write_lock
+from .registrations import invalidates_round_cache
 
 
+@with_write_lock
 def create_company(name: str, description: str = None) -> Dict:
     """Create a new company"""
     try:
@@ -104,6 +106,7 @@ def get_all_companies() -> List[Dict]:
         raise HTTPException(status_code=500, detail=f"Database error: {e}")
 
 
+@with_write_lock
 def update_company(company_id: int, name: str = None, description: str = None) -> bool:
     """Update company details"""
     try:
@@ -134,6 +137,7 @@ def update_company(company_id: int, name: str = None, description: str = None) -
         raise HTTPException(status_code=500, detail=f"Database error: {e}")
 
 
+@with_write_lock
 def deactivate_company(company_id: int) -> bool:
     """Deactivate a company (soft delete)"""
     try:
@@ -181,6 +185,8 @@ def get_company_data_access(company_id: int) -> Dict:
         raise HTTPException(status_code=500, detail=f"Database error: {e}")
 
 
+@with_write_lock
+@invalidates_round_cache
 def migrate_user_data_to_company(firebase_uid: str, company_id: int) -> bool:
     """
     Migrate existing user data to company
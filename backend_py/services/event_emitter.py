@@ -15,13 +15,21 @@ import uuid
 import json
 import logging
 from datetime import datetime
-from typing import Dict, Optional, Any, List
-from ..db import conn
+from typing import Dict, Iterable, Optional, Any, List
+from ..db import conn, commit_writes, with_write_lock
 from ..events.event_types import EventType
 
 logger = logging.getLogger(__name__)
 
+_INSERT_EVENT_SQL = """
+    INSERT INTO domain_events
+    (event_id, animal_id, animal_number, event_type, event_version,
+     payload, metadata, company_id, user_id, event_time)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
 
+@with_write_lock
 def emit_event(
     event_type: EventType | str,
     animal_id: int | None,
@@ -83,12 +91,7 @@ def emit_event(
     
     try:
         cursor = conn.execute(
-            """
-            INSERT INTO domain_events 
-            (event_id, animal_id, animal_number, event_type, event_version, 
-             payload, metadata, company_id, user_id, event_time)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """,
+            _INSERT_EVENT_SQL,
             (
                 event_id,
                 animal_id,
@@ -102,7 +105,7 @@ def emit_event(
                 event_time,
             )
         )
-        conn.commit()
+        commit_writes()
         
         event_db_id = cursor.lastrowid
         logger.info(f"Emitted event {event_type_str} (id={event_db_id}, event_id={event_id}) for animal {animal_number}")
@@ -317,6 +320,71 @@ def emit_field_change(
     )
 
 
+@with_write_lock
+def emit_field_changes_batch(
+    animal_id: int | None,
+    animal_number: str,
+    company_id: int,
+    user_id: str,
+    changes: Iterable[tuple],
+    notes: Optional[str] = None,
+) -> int:
+    """
+    Emit several field change events for one animal with a single executemany.
+    
+    Args:
+        animal_id: The animal ID the events relate to
+        animal_number: The animal number
+        company_id: The company ID for data isolation
+        user_id: The user who triggered the changes
+        changes: (event_type, field_name, old_value, new_value) tuples, in emission order
+        notes: Notes stored in every payload
+    
+    Returns:
+        The number of events written
+    """
+    if not company_id:
+        raise ValueError("company_id is required for all events")
+    if not user_id:
+        raise ValueError("user_id is required for all events")
+    if not animal_number:
+        raise ValueError("animal_number is required for all events")
+    
+    now = datetime.utcnow().isoformat()
+    metadata = json.dumps({"source": "application", "emitted_at": now})
+    rows = [
+        (
+            str(uuid.uuid4()),
+            animal_id,
+            animal_number,
+            event_type.value if isinstance(event_type, EventType) else str(event_type),
+            1,
+            json.dumps(
+                {"field_name": field_name, "old_value": old_value, "new_value": new_value, "notes": notes},
+                default=str,
+            ),
+            metadata,
+            company_id,
+            user_id,
+            now,
+        )
+        for event_type, field_name, old_value, new_value in changes
+    ]
+    if not rows:
+        return 0
+    
+    try:
+        # Rows share event_time; snapshot replay orders ties by id, i.e. list order
+        conn.executemany(_INSERT_EVENT_SQL, rows)
+        commit_writes()
+    except Exception as e:
+        logger.error(f"Failed to emit {len(rows)} field change events for animal {animal_number}: {e}")
+        raise
+    
+    logger.info(f"Emitted {len(rows)} field change events for animal {animal_number}")
+    return len(rows)
+
+
 def ensure_animal_has_events(
     animal_number: str,
     company_id: int,
@@ -328,10 +396,13 @@ def ensure_animal_has_events(
     color: Optional[str] = None,
     notes: Optional[str] = None,
     rp_animal: Optional[str] = None,
+    project_by_number: bool = False,
 ) -> bool:
     """
     Check if an animal has domain events. If not, create a birth_registered event.
     This makes mothers/fathers first-class animals in the event sourcing system.
+    A newly created animal's snapshot is projected once: by animal_id when it has
+    a registration, otherwise by animal_number if project_by_number is set.
     
     Args:
         animal_number: The animal number to check/create
@@ -344,6 +415,7 @@ def ensure_animal_has_events(
         color: Color (if available)
         notes: Notes (if available)
         rp_animal: RP animal (if available)
+        project_by_number: Project registration-less animals by animal_number
     
     Returns:
         True if events were created, False if animal already had events
@@ -353,16 +425,7 @@ def ensure_animal_has_events(
     
     try:
         # Check if animal has any domain events
-        cursor = conn.execute(
-            """
-            SELECT COUNT(*) FROM domain_events 
-            WHERE animal_number = ? AND company_id = ?
-            """,
-            (animal_number.strip().upper(), company_id)
-        )
-        count = cursor.fetchone()[0]
-        
-        if count > 0:
+        if animal_has_events_by_number(animal_number.strip().upper(), company_id):
             # Animal already has events
             return False
         
@@ -434,13 +497,16 @@ def ensure_animal_has_events(
                 insemination_identifier=None,
             )
         
-        # Project snapshot if we have an animal_id
+        # Project snapshot if we have an animal_id (or by number when requested)
         if animal_id:
             try:
                 from .snapshot_projector import project_animal_snapshot
                 project_animal_snapshot(animal_id, company_id)
             except Exception as e:
                 logger.warning(f"Failed to project snapshot for animal {animal_id}: {e}")
+        elif project_by_number:
+            from .snapshot_projector import project_animal_snapshot_by_number
+            project_animal_snapshot_by_number(animal_number.strip().upper(), company_id)
         
         return True
     except Exception as e:
@@ -560,6 +626,19 @@ def get_events_for_animal(animal_id: int, company_id: int) -> List[Dict[str, Any
     ]
 
 
+def animal_has_events_by_number(animal_number: str, company_id: int) -> bool:
+    """Return whether any domain event exists for animal_number, without loading them."""
+    cursor = conn.execute(
+        """
+        SELECT 1 FROM domain_events
+        WHERE animal_number = ? AND company_id = ?
+        LIMIT 1
+        """,
+        (animal_number, company_id)
+    )
+    return cursor.fetchone() is not None
+
+
 def get_events_for_animal_by_number(animal_number: str, company_id: int) -> List[Dict[str, Any]]:
     """
     Get all domain events for a specific animal by animal_number.
@@ -597,6 +676,50 @@ def get_events_for_animal_by_number(animal_number: str, company_id: int) -> List
     ]
 
 
+def get_events_for_animals_by_number(
+    animal_numbers: Iterable[str],
+    company_id: int,
+) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Get domain events for several animals in one query, keyed by animal_number.
+    
+    Every requested number is present in the result (empty list if it has no
+    events); each list has the same ordering as get_events_for_animal_by_number.
+    """
+    numbers = list(dict.fromkeys(n for n in animal_numbers if n))
+    events: Dict[str, List[Dict[str, Any]]] = {n: [] for n in numbers}
+    if not numbers:
+        return events
+    
+    cursor = conn.execute(
+        f"""
+        SELECT id, event_id, animal_id, animal_number, event_type, event_version,
+               payload, metadata, company_id, user_id, event_time, created_at
+        FROM domain_events
+        WHERE animal_number IN ({', '.join('?' for _ in numbers)}) AND company_id = ?
+        ORDER BY event_time ASC, id ASC
+        """,
+        (*numbers, company_id)
+    )
+    
+    for row in cursor.fetchall():
+        events[row[3]].append({
+            "id": row[0],
+            "event_id": row[1],
+            "animal_id": row[2],
+            "animal_number": row[3],
+            "event_type": row[4],
+            "event_version": row[5],
+            "payload": json.loads(row[6]) if row[6] else {},
+            "metadata": json.loads(row[7]) if row[7] else {},
+            "company_id": row[8],
+            "user_id": row[9],
+            "event_time": row[10],
+            "created_at": row[11],
+        })
+    return events
+
+
 def get_events_since(
     company_id: int,
     since_event_id: Optional[int] = None,
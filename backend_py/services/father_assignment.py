@@ -6,7 +6,7 @@ Handles automatic assignment of father IDs to registrations based on inseminatio
 import sqlite3
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Tuple
-from ..db import conn
+from ..db import conn, with_write_lock
 
 
 class FatherAssignmentService:
@@ -96,6 +96,7 @@ class FatherAssignmentService:
         # If gestation is less than min_gestation_days, return None (no assignment)
         return best_match
     
+    @with_write_lock
     def assign_father_id(self, registration_id: int, father_id: str, insemination_identifier: str = None, insemination_round_id: str = None) -> bool:
         """Assign father_id, insemination_identifier, and insemination_round_id to a registration.
         Only updates insemination_round_id if it's currently missing (NULL or empty).
@@ -2,7 +2,7 @@ import sqlite3
 import datetime as _dt
 import logging
 from fastapi import HTTPException
-from ..db import conn
+from ..db import conn, with_write_lock
 from ..models import InseminationBody, UpdateInseminationBody
 from .auth_service import get_data_filter_clause
 from .event_emitter import (
@@ -12,6 +12,7 @@ from .event_emitter import (
 )
 from .snapshot_projector import project_animal_snapshot_by_number, project_animal_snapshot
 from ..events.event_types import EventType
+from .registrations import invalidates_round_cache
 
 def _normalize_text(value: str | None) -> str | None:
     """Normalize text input - strip whitespace and convert to uppercase"""
@@ -70,6 +71,8 @@ def _validate_date(date_str: str) -> str:
             raise HTTPException(status_code=400, detail=f"Invalid date format: {error_msg}")
         raise HTTPException(status_code=400, detail=f"Invalid date format: {error_msg}. Use dd/mm/yyyy format (e.g., 15/01/2024)")
 
+@with_write_lock
+@invalidates_round_cache
 def insert_insemination(created_by: str, body: InseminationBody, company_id: int = None) -> int:
     """Insert a new insemination record and trigger background father assignment"""
     if not body.inseminationIdentifier:
@@ -125,13 +128,12 @@ def insert_insemination(created_by: str, body: InseminationBody, company_id: int
             if company_id:
                 try:
                     # Check if mother already has events
-                    from .event_emitter import ensure_animal_has_events, get_events_for_animal_by_number
+                    from .event_emitter import ensure_animal_has_events, animal_has_events_by_number
                     from .snapshot_projector import get_snapshot_by_number
                     
-                    mother_events = get_events_for_animal_by_number(mother_id, company_id)
                     snapshot_projected = False
                     
-                    if len(mother_events) > 0:
+                    if animal_has_events_by_number(mother_id, company_id):
                         # Mother has events - update values from snapshot
                         mother_snapshot = get_snapshot_by_number(mother_id, company_id)
                         
@@ -201,8 +203,8 @@ def insert_insemination(created_by: str, body: InseminationBody, company_id: int
             except Exception as e:
                 # Log but don't fail the request if background task fails
                 logging.warning(f"Failed to trigger background father assignment for {mother_id}: {e}")
-            
-            return insemination_db_id
+        
+        return insemination_db_id
     except sqlite3.IntegrityError as e:
         if "UNIQUE constraint failed" in str(e):
             raise HTTPException(status_code=409, detail="Duplicate insemination for this mother on the same date")
@@ -210,6 +212,8 @@ def insert_insemination(created_by: str, body: InseminationBody, company_id: int
     except sqlite3.Error as e:
         raise HTTPException(status_code=500, detail=f"Database error: {e}")
 
+@with_write_lock
+@invalidates_round_cache
 def update_insemination(created_by: str, insemination_id: int, body: UpdateInseminationBody, company_id: int = None) -> None:
     """Update an existing insemination record"""
     if not body.inseminationIdentifier:
@@ -319,7 +323,7 @@ def update_insemination(created_by: str, insemination_id: int, body: UpdateInsem
                         project_animal_snapshot_by_number(mother_id, record_company_id)
                 except Exception as e:
                     logging.warning(f"Failed to emit insemination update events: {e}")
-                    
+        
     except sqlite3.IntegrityError as e:
         if "UNIQUE constraint failed" in str(e):
             raise HTTPException(status_code=409, detail="Duplicate insemination for this mother on the same date")
@@ -327,6 +331,8 @@ def update_insemination(created_by: str, insemination_id: int, body: UpdateInsem
     except sqlite3.Error as e:
         raise HTTPException(status_code=500, detail=f"Database error: {e}")
 
+@with_write_lock
+@invalidates_round_cache
 def delete_insemination(created_by: str, insemination_id: int, company_id: int = None) -> None:
     """Delete an insemination record.
     
@@ -5,8 +5,9 @@ Handles CRUD operations for insemination IDs lookup table
 
 import sqlite3
 from fastapi import HTTPException
-from ..db import conn
+from ..db import conn, with_write_lock
 from ..models import InseminationIdBody, UpdateInseminationIdBody
+from .registrations import invalidates_round_cache
 
 
 def get_inseminations_ids(company_id: int | None = None) -> list[dict]:
@@ -59,6 +60,8 @@ def get_insemination_id_by_round_id(insemination_round_id: str, company_id: int
         raise HTTPException(status_code=500, detail=f"Database error: {e}")
 
 
+@with_write_lock
+@invalidates_round_cache
 def create_insemination_id(body: InseminationIdBody) -> int:
     """Create a new insemination ID"""
     try:
@@ -75,8 +78,7 @@ def create_insemination_id(body: InseminationIdBody) -> int:
                 body.notes,
                 body.company_id
             ))
-            
-            return cursor.lastrowid
+        return cursor.lastrowid
     except sqlite3.IntegrityError as e:
         if "UNIQUE constraint failed" in str(e):
             raise HTTPException(status_code=409, detail="Insemination round ID already exists for this company")
@@ -85,6 +87,8 @@ def create_insemination_id(body: InseminationIdBody) -> int:
         raise HTTPException(status_code=500, detail=f"Database error: {e}")
 
 
+@with_write_lock
+@invalidates_round_cache
 def update_insemination_id(insemination_round_id: str, body: UpdateInseminationIdBody, company_id: int | None = None) -> None:
     """Update an existing insemination ID"""
     try:
@@ -138,6 +142,8 @@ def update_insemination_id(insemination_round_id: str, body: UpdateInseminationI
         raise HTTPException(status_code=500, detail=f"Database error: {e}")
 
 
+@with_write_lock
+@invalidates_round_cache
 def delete_insemination_id(insemination_round_id: str, company_id: int | None = None) -> None:
     """Delete an insemination ID"""
     try:
@@ -8,9 +8,10 @@ import pandas as pd
 import io
 from typing import List, Dict, Tuple, Optional
 from fastapi import HTTPException, UploadFile
-from ..db import conn
+from ..db import conn, write_lock
 from ..models import InseminationBody
 from .inseminations import _normalize_text, _validate_date
+from .registrations import invalidates_round_cache
 
 
 def find_column(df: pd.DataFrame, column_keywords: List[str], require_id: bool = False, verbose: bool = True) -> Optional[str]:
@@ -130,6 +131,7 @@ async def parse_insemination_file(file: UploadFile, insemination_round_id: str)
     return df_selected, column_mapping
 
 
+@invalidates_round_cache
 async def upload_inseminations_from_file(
     file: UploadFile,
     insemination_round_id: str,
@@ -173,7 +175,7 @@ async def upload_inseminations_from_file(
     # STRICT VALIDATION: Round must exist for this company before upload
     # No auto-creation - user must explicitly create round first
     try:
-        with conn:
+        with write_lock, conn:
             # Check if round exists for this company
             cursor = conn.execute(
                 """
@@ -239,7 +241,7 @@ async def upload_inseminations_from_file(
     processed_mother_ids = []  # Track mother IDs for background father assignment
     
     try:
-        with conn:
+        with write_lock, conn:
             for index, row in df.iterrows():
                 try:
                     # Extract and normalize data
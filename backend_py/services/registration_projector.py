@@ -12,23 +12,41 @@ Key principles:
 """
 
 import logging
+import secrets
 import sqlite3
 from datetime import datetime
 from typing import Dict, Optional, Any
 
-from ..db import conn
+from ..db import conn, commit_writes, with_write_lock
 
 logger = logging.getLogger(__name__)
 
 
+# Uppercase hex without 'E', matching the ids SQLite used to generate
+# (spreadsheets read values like "12E45" as numbers).
+_SHORT_ID_ALPHABET = "0123456789ABCDF"
+
+
 def generate_short_id() -> str:
     """Generate a unique short_id for registrations."""
-    cursor = conn.execute(
-        "SELECT substr(replace(hex(randomblob(16)), 'E', ''), 1, 10)"
-    )
-    return cursor.fetchone()[0]
+    return "".join(secrets.choice(_SHORT_ID_ALPHABET) for _ in range(10))
+
+
+# animal_types ids by gender (1 = cow, 2 = bull); UNKNOWN/None have no type
+GENDER_TO_ANIMAL_TYPE = {"FEMALE": 1, "MALE": 2}
 
+# Registration columns written from a snapshot, in the order of `projected` below
+_PROJECTED_COLUMNS = (
+    "animal_number", "mother_id", "father_id", "born_date", "weight", "current_weight",
+    "gender", "animal_type", "status", "color", "notes", "notes_mother",
+    "insemination_round_id", "insemination_identifier", "scrotal_circumference",
+    "rp_animal", "rp_mother", "mother_weight", "weaning_weight",
+    "death_date", "sold_date", "animal_idv",
+)
+_SELECT_PROJECTED_SQL = f"SELECT id, {', '.join(_PROJECTED_COLUMNS)} FROM registrations WHERE id = ?"
 
+
+@with_write_lock
 def project_registration_from_snapshot(
     animal_id: int,
     snapshot: Dict[str, Any],
@@ -84,79 +102,44 @@ def project_registration_from_snapshot(
     sold_date = snapshot.get('sold_date')
     animal_idv = snapshot.get('animal_idv')
     
-    # Determine animal_type based on gender
-    animal_type = None
-    if gender:
-        if gender == 'FEMALE':
-            animal_type = 1  # Cow
-        elif gender == 'MALE':
-            animal_type = 2  # Bull
+    animal_type = GENDER_TO_ANIMAL_TYPE.get(gender)
+    
+    projected = (
+        animal_number, mother_id, father_id, born_date, weight, current_weight,
+        gender, animal_type, status, color, notes, notes_mother,
+        insemination_round_id, insemination_identifier, scrotal_circumference,
+        rp_animal, rp_mother, mother_weight, weaning_weight,
+        death_date, sold_date, animal_idv,
+    )
     
     try:
-        # Check if registration already exists
+        # Check if registration already exists (and read its current projected values)
         cursor = conn.execute(
-            "SELECT id, short_id FROM registrations WHERE id = ?",
+            _SELECT_PROJECTED_SQL,
             (animal_id,)
         )
         existing = cursor.fetchone()
         
         if existing:
-            # UPDATE existing registration
+            # UPDATE only the columns whose projected value changed
+            changed = [
+                (column, value)
+                for column, value, old_value in zip(_PROJECTED_COLUMNS, projected, existing[1:])
+                if value != old_value
+            ]
+            if not changed:
+                logger.debug(f"Registration for animal_id={animal_id} already up to date")
+                return animal_id
             conn.execute(
-                """
+                f"""
                 UPDATE registrations SET
-                    animal_number = ?,
-                    mother_id = ?,
-                    father_id = ?,
-                    born_date = ?,
-                    weight = ?,
-                    current_weight = ?,
-                    gender = ?,
-                    animal_type = ?,
-                    status = ?,
-                    color = ?,
-                    notes = ?,
-                    notes_mother = ?,
-                    insemination_round_id = ?,
-                    insemination_identifier = ?,
-                    scrotal_circumference = ?,
-                    rp_animal = ?,
-                    rp_mother = ?,
-                    mother_weight = ?,
-                    weaning_weight = ?,
-                    death_date = ?,
-                    sold_date = ?,
-                    animal_idv = ?,
+                    {', '.join(f'{column} = ?' for column, _ in changed)},
                     updated_at = datetime('now')
                 WHERE id = ?
                 """,
-                (
-                    animal_number,
-                    mother_id,
-                    father_id,
-                    born_date,
-                    weight,
-                    current_weight,
-                    gender,
-                    animal_type,
-                    status,
-                    color,
-                    notes,
-                    notes_mother,
-                    insemination_round_id,
-                    insemination_identifier,
-                    scrotal_circumference,
-                    rp_animal,
-                    rp_mother,
-                    mother_weight,
-                    weaning_weight,
-                    death_date,
-                    sold_date,
-                    animal_idv,
-                    animal_id,
-                )
+                tuple(value for _, value in changed) + (animal_id,)
             )
-            conn.commit()
+            commit_writes()
             logger.debug(f"Updated registration for animal_id={animal_id}")
         else:
             # INSERT new registration
@@ -204,7 +187,7 @@ def project_registration_from_snapshot(
                     animal_idv,
                 )
             )
-            conn.commit()
+            commit_writes()
             logger.debug(f"Inserted registration for animal_id={animal_id}")
         
         return animal_id
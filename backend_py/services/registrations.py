@@ -1,30 +1,225 @@
+import logging
 import sqlite3
 import json
 import datetime as _dt
+import inspect
+import itertools
+import time
 from datetime import timedelta
-from typing import Optional
+from functools import lru_cache, wraps
+from typing import Iterator, Optional
 from fastapi import HTTPException
-from ..db import conn
+from ..db import (
+    conn, get_read_conn, open_read_conn, release_read_conn, with_write_lock, write_transaction, batch_transaction,
+)
 from .auth_service import get_data_filter_clause
 from .event_emitter import (
     emit_birth_registered,
     emit_death_recorded,
     emit_field_change,
+    emit_field_changes_batch,
     emit_animal_deleted,
     ensure_animal_has_events,
-    get_events_for_animal_by_number,
+    animal_has_events_by_number,
+    get_events_for_animals_by_number,
 )
-from .snapshot_projector import project_animal_snapshot, project_animal_snapshot_by_number, get_snapshot_by_number, get_snapshot
-from .registration_projector import project_registration_from_snapshot
+from .snapshot_projector import project_animal_snapshot, project_animal_snapshot_by_number
+from .registration_projector import project_registration_from_snapshot, generate_short_id, GENDER_TO_ANIMAL_TYPE
 from ..events.event_types import EventType
 
-VALID_GENDERS = {"MALE", "FEMALE", "UNKNOWN"}
-VALID_STATUSES = {"ALIVE", "DEAD", "UNKNOWN", "SOLD"}
-VALID_COLORS = {"COLORADO", "MARRON", "NEGRO", "OTHERS"}
+logger = logging.getLogger(__name__)
+
+VALID_GENDERS = frozenset({"MALE", "FEMALE", "UNKNOWN"})
+VALID_STATUSES = frozenset({"ALIVE", "DEAD", "UNKNOWN", "SOLD"})
+VALID_COLORS = frozenset({"COLORADO", "MARRON", "NEGRO", "OTHERS"})
+
+_GENDER_ERR = f"Invalid gender. Must be one of: {', '.join(sorted(VALID_GENDERS))}"
+_STATUS_ERR = f"Invalid status. Must be one of: {', '.join(sorted(VALID_STATUSES))}"
+_COLOR_ERR = f"Invalid color. Must be one of: {', '.join(sorted(VALID_COLORS))}"
+
+# Rows fetched per round trip when streaming exports
+EXPORT_BATCH_SIZE = 1000
+
+# Column order of the tuples yielded by export_rows / export_rows_multi_tenant
+EXPORT_COLUMNS = (
+    "animal_number", "born_date", "mother_id", "father_id",
+    "weight", "gender", "animal_type", "status", "color", "notes", "notes_mother", "created_at",
+    "insemination_round_id", "insemination_identifier", "scrotal_circumference",
+    "rp_animal", "rp_mother", "mother_weight", "weaning_weight", "animal_idv",
+)
+
+# Response keys of get_registrations_multi_tenant, in _registrations_list_sql's SELECT order
+_REGISTRATION_LIST_KEYS = (
+    "id", "animalNumber", "createdAt", "motherId", "bornDate", "weight",
+    "gender", "status", "color", "notes", "notesMother", "inseminationRoundId",
+    "inseminationIdentifier", "scrotalCircumference", "animalType",
+    "rpAnimal", "rpMother", "motherWeight", "weaningWeight",
+)
+
+# Days between estimated insemination and birth used to infer the round year
+_GESTATION_DAYS = timedelta(days=300)
+
+
+def _parse_ymd(value: str) -> _dt.date:
+    """Parse a YYYY-MM-DD string, slicing the common zero-padded form directly.
+
+    Anything else falls back to strptime so accepted inputs and the ValueError
+    raised on bad ones stay identical.
+    """
+    if (len(value) == 10 and value[4] == "-" and value[7] == "-" and value.isascii()
+            and value[:4].isdigit() and value[5:7].isdigit() and value[8:].isdigit()):
+        return _dt.date(int(value[:4]), int(value[5:7]), int(value[8:]))
+    return _dt.datetime.strptime(value, "%Y-%m-%d").date()
+
 
 def _normalize_text(value: str | None) -> str | None:
     return (value or "").strip().upper() or None
 
+
+def normalize_animal_number(value: str | None) -> str | None:
+    """Normalize an animal number the way registrations and snapshots store it."""
+    return _normalize_text(value)
+
+
+class ExportRows:
+    """Iterator over export rows, fetched in EXPORT_BATCH_SIZE chunks instead of fetchall().
+
+    The cursors run on a private connection from open_read_conn(). It is released
+    when the rows run out or on close(); close() also works before iteration has
+    started, so routes hand it to the response as a background task and a client
+    that disconnects early can't leak the connection.
+    """
+
+    def __init__(self, read_conn: sqlite3.Connection, cursors: list[sqlite3.Cursor]):
+        self._read_conn = read_conn
+        self._cursors = cursors
+        self._rows = self._fetch()
+
+    def __iter__(self) -> "ExportRows":
+        return self
+
+    def __next__(self) -> tuple:
+        return next(self._rows)
+
+    def _fetch(self) -> Iterator[tuple]:
+        for cursor in self._cursors:
+            while True:
+                rows = cursor.fetchmany(EXPORT_BATCH_SIZE)
+                if not rows:
+                    break
+                yield from rows
+        self.close()
+
+    def close(self) -> None:
+        """Release the read connection (idempotent)."""
+        read_conn, self._read_conn = self._read_conn, None
+        if read_conn is None:
+            return
+        for cursor in self._cursors:
+            cursor.close()
+        release_read_conn(read_conn)
+
+# Export date predicates compare date(column), so stored values that aren't plain
+# YYYY-MM-DD (e.g. with a time part) still match; the tenant + date(column)
+# expression indexes keep them sargable. Precomputed per column and filter shape
+# so the SQL text stays stable for sqlite3's statement cache.
+_DATE_FILTER_SQL = {
+    (column, shape): sql.format(col=column)
+    for column in ("born_date", "birth_date")
+    for shape, sql in (
+        ("day", " AND date({col}) = date(?)"),
+        ((True, True), " AND date({col}) >= date(?) AND date({col}) <= date(?)"),
+        ((True, False), " AND date({col}) >= date(?)"),
+        ((False, True), " AND date({col}) <= date(?)"),
+        ((False, False), ""),
+    )
+}
+
+def _date_filter(column: str, date: str | None, start: str | None, end: str | None) -> tuple[str, tuple]:
+    """Return the (" AND ..." SQL, params) for an export date filter; date wins over start/end."""
+    if date:
+        return _DATE_FILTER_SQL[column, "day"], (date,)
+    return _DATE_FILTER_SQL[column, (bool(start), bool(end))], tuple(v for v in (start, end) if v)
+
+_ROUND_ID_LOOKUP = """
+    SELECT insemination_round_id FROM (
+        SELECT insemination_round_id, 0 AS prio
+        FROM inseminations_ids
+        WHERE {tenant}(insemination_round_id = ? OR insemination_round_id LIKE ?)
+        UNION ALL
+        SELECT insemination_round_id, 1 AS prio
+        FROM inseminations
+        WHERE {tenant}(insemination_round_id = ? OR insemination_round_id LIKE ?)
+    )
+    ORDER BY prio, insemination_round_id DESC
+    LIMIT 1
+"""
+_ROUND_ID_LOOKUP_SQL = _ROUND_ID_LOOKUP.format(tenant="company_id = ? AND ")
+_ROUND_ID_LOOKUP_LEGACY_SQL = _ROUND_ID_LOOKUP.format(tenant="")
+
+
+# The round cache lives in each worker process; invalidate_round_cache() only
+# clears the local copy, so entries also expire after this many seconds to bound
+# how long other workers can serve a stale round id.
+_ROUND_CACHE_TTL_SECONDS = 60
+
+
+@lru_cache(maxsize=512)
+def _lookup_round_id(company_id: int | None, estimated_year: str, ttl_bucket: int) -> Optional[str]:
+    """Resolve the insemination round for (company_id, estimated_year).
+    Memoized per ttl_bucket: births in a batch cluster into a few years. Any
+    writer of inseminations_ids or inseminations must be decorated with
+    @invalidates_round_cache.
+    """
+    # inseminations_ids (round definitions) is more reliable, so its match wins
+    # over the inseminations table fallback; one statement covers both.
+    pattern = f"{estimated_year}%"
+    if company_id:
+        cursor = conn.execute(
+            _ROUND_ID_LOOKUP_SQL,
+            (company_id, estimated_year, pattern, company_id, estimated_year, pattern),
+        )
+    else:
+        # For legacy records without company_id
+        cursor = conn.execute(
+            _ROUND_ID_LOOKUP_LEGACY_SQL,
+            (estimated_year, pattern, estimated_year, pattern),
+        )
+    
+    result = cursor.fetchone()
+    return result[0] if result else None
+
+
+def invalidate_round_cache() -> None:
+    """Drop this process's memoized round-id lookups after inseminations_ids/inseminations change."""
+    _lookup_round_id.cache_clear()
+
+
+def invalidates_round_cache(func):
+    """Call invalidate_round_cache() whenever func returns or raises.
+
+    A failing write may already have committed part of its changes, so this
+    doesn't wait for success. Works on sync and async functions; put it below
+    @with_write_lock so the cache is cleared before the lock is released.
+    """
+    if inspect.iscoroutinefunction(func):
+        @wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                invalidate_round_cache()
+        return async_wrapper
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        try:
+            return func(*args, **kwargs)
+        finally:
+            invalidate_round_cache()
+    return wrapper
+
+
 def _auto_assign_insemination_round_id(born_date: str, company_id: int | None) -> Optional[str]:
     """
     Auto-assign insemination_round_id based on birth date.
@@ -43,105 +238,80 @@ def _auto_assign_insemination_round_id(born_date: str, company_id: int | None) -
         return None
     
     try:
-        # Parse birth date
-        birth_dt = _dt.datetime.strptime(born_date, '%Y-%m-%d').date()
-        # Calculate estimated insemination date (300 days before birth)
-        estimated_insem_date = birth_dt - timedelta(days=300)
-        estimated_year = str(estimated_insem_date.year)
-        
-        # First, try to find in inseminations_ids table (round definitions) - this is more reliable
-        if company_id:
-            cursor = conn.execute("""
-                SELECT insemination_round_id 
-                FROM inseminations_ids 
-                WHERE company_id = ? 
-                AND (insemination_round_id = ? OR insemination_round_id LIKE ?)
-                ORDER BY insemination_round_id DESC
-                LIMIT 1
-            """, (company_id, estimated_year, f"{estimated_year}%"))
-        else:
-            # For legacy records without company_id
-            cursor = conn.execute("""
-                SELECT insemination_round_id 
-                FROM inseminations_ids 
-                WHERE (insemination_round_id = ? OR insemination_round_id LIKE ?)
-                ORDER BY insemination_round_id DESC
-                LIMIT 1
-            """, (estimated_year, f"{estimated_year}%"))
+        # Estimated insemination date is 300 days before birth
+        estimated_year = str((_parse_ymd(born_date) - _GESTATION_DAYS).year)
         
-        result = cursor.fetchone()
-        if result:
-            return result[0]
-        
-        # If not found in inseminations_ids, try inseminations table as fallback
-        if company_id:
-            cursor = conn.execute("""
-                SELECT DISTINCT insemination_round_id 
-                FROM inseminations 
-                WHERE company_id = ? 
-                AND (insemination_round_id = ? OR insemination_round_id LIKE ?)
-                ORDER BY insemination_round_id DESC
-                LIMIT 1
-            """, (company_id, estimated_year, f"{estimated_year}%"))
-        else:
-            # For legacy records without company_id
-            cursor = conn.execute("""
-                SELECT DISTINCT insemination_round_id 
-                FROM inseminations 
-                WHERE (insemination_round_id = ? OR insemination_round_id LIKE ?)
-                ORDER BY insemination_round_id DESC
-                LIMIT 1
-            """, (estimated_year, f"{estimated_year}%"))
-        
-        result = cursor.fetchone()
-        return result[0] if result else None
+        return _lookup_round_id(company_id, estimated_year, int(time.monotonic() // _ROUND_CACHE_TTL_SECONDS))
     except Exception as e:
         # Log the error for debugging but don't raise
-        import logging
-        logging.error(f"Error in _auto_assign_insemination_round_id: {e}")
+        logger.error(f"Error in _auto_assign_insemination_round_id: {e}")
         return None
 
-def insert_registration(created_by_or_key: str, body, company_id: int = None) -> None:
+# Column order shared by the legacy single-row UPDATE and the bulk INSERT
+REGISTRATION_FIELDS = (
+    "mother_id", "father_id", "born_date", "weight", "current_weight",
+    "gender", "animal_type", "status", "color", "notes", "notes_mother",
+    "insemination_round_id", "insemination_identifier", "scrotal_circumference",
+    "rp_animal", "rp_mother", "mother_weight", "weaning_weight",
+    "death_date", "sold_date", "animal_idv",
+)
+
+# SQL whose text never changes, built once at import
+_LEGACY_UPDATE_SQL = f"""
+    UPDATE registrations SET
+        {', '.join(f'{col} = :{col}' for col in REGISTRATION_FIELDS)}, updated_at = datetime('now')
+    WHERE id = :id
+"""
+_BULK_INSERT_COLUMNS = ("animal_number", "created_at") + REGISTRATION_FIELDS
+_BULK_INSERT_ROW = f"({', '.join('?' for _ in _BULK_INSERT_COLUMNS)}, ?, NULL, ?)"
+# Rows per multi-row INSERT, keeping the bound parameters under SQLite's
+# default SQLITE_MAX_VARIABLE_NUMBER of 999 (older builds' limit)
+_BULK_INSERT_CHUNK = 999 // (len(_BULK_INSERT_COLUMNS) + 2)
+
+@lru_cache(maxsize=8)
+def _bulk_insert_sql(row_count: int) -> str:
+    # Only the full chunk and a per-call remainder come through, so the text stays cached
+    return f"""
+        INSERT INTO registrations (
+            {', '.join(_BULK_INSERT_COLUMNS)}, created_by, company_id, short_id
+        )
+        VALUES {', '.join([_BULK_INSERT_ROW] * row_count)}
+        RETURNING id, short_id
+    """
+_EXPORT_SELECT = f"SELECT {', '.join(EXPORT_COLUMNS)} FROM registrations"
+
+def _parse_bounded_float(value, label: str, upper: int, unit: str) -> float | None:
+    """Parse an optional numeric field and check 0 <= value <= upper; raises HTTPException(400)."""
+    if value is None:
+        return None
+    try:
+        parsed = float(value)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail=f"Invalid {label.lower()} value")
+    if not (0 <= parsed <= upper):
+        raise HTTPException(status_code=400, detail=f"{label} must be between 0 and {upper} {unit}")
+    return parsed
+
+def _validate_registration_body(body) -> dict:
+    """Validate and normalize a Register/Update body into registration column values.
+
+    Pure (no DB access); raises HTTPException(400) on invalid input.
+    """
     if not body.animalNumber:
         raise HTTPException(status_code=400, detail="animalNumber required")
 
-    created_at = body.createdAt if (body.createdAt and isinstance(body.createdAt, str)) else None
-    if not created_at:
-        created_at = _dt.datetime.utcnow().isoformat()
-
     animal = _normalize_text(body.animalNumber)
     mother = _normalize_text(body.motherId)
     father = _normalize_text(body.fatherId)
-    animal_idv = _normalize_text(body.animalIdv) if hasattr(body, 'animalIdv') else None
+    animal_idv = _normalize_text(body.animalIdv)
 
-    weight = None
-    if body.weight is not None:
-        try:
-            weight = float(body.weight)
-            if not (0 <= weight <= 10000):
-                raise HTTPException(status_code=400, detail="Weight must be between 0 and 10000 kg")
-        except (ValueError, TypeError):
-            raise HTTPException(status_code=400, detail="Invalid weight value")
-
-    scrotal_circumference = None
-    if body.scrotalCircumference is not None:
-        try:
-            scrotal_circumference = float(body.scrotalCircumference)
-            if not (0 <= scrotal_circumference <= 100):
-                raise HTTPException(status_code=400, detail="Scrotal circumference must be between 0 and 100 cm")
-        except (ValueError, TypeError):
-            raise HTTPException(status_code=400, detail="Invalid scrotal circumference value")
+    weight = _parse_bounded_float(body.weight, "Weight", 10000, "kg")
+    scrotal_circumference = _parse_bounded_float(body.scrotalCircumference, "Scrotal circumference", 100, "cm")
 
     gender = _normalize_text(body.gender)
     
-    # Determine animal_type based on gender
-    animal_type = None
-    if gender:
-        if gender == 'FEMALE':
-            animal_type = 1  # Cow
-        elif gender == 'MALE':
-            animal_type = 2  # Bull
-        # UNKNOWN gender will have animal_type = None
+    # Determine animal_type based on gender (UNKNOWN gender has no animal_type)
+    animal_type = GENDER_TO_ANIMAL_TYPE.get(gender)
     
     status = _normalize_text(body.status)
     color = _normalize_text(body.color)
@@ -152,54 +322,22 @@ def insert_registration(created_by_or_key: str, body, company_id: int = None) ->
     rp_animal = _normalize_text(body.rpAnimal)
     rp_mother = _normalize_text(body.rpMother)
 
-    # Handle mother_weight validation
-    mother_weight = None
-    if body.motherWeight is not None:
-        try:
-            mother_weight = float(body.motherWeight)
-            if not (0 <= mother_weight <= 10000):
-                raise HTTPException(status_code=400, detail="Mother weight must be between 0 and 10000 kg")
-        except (ValueError, TypeError):
-            raise HTTPException(status_code=400, detail="Invalid mother weight value")
-
-    # Handle weaning_weight validation
-    weaning_weight = None
-    if body.weaningWeight is not None:
-        try:
-            weaning_weight = float(body.weaningWeight)
-            if not (0 <= weaning_weight <= 10000):
-                raise HTTPException(status_code=400, detail="Weaning weight must be between 0 and 10000 kg")
-        except (ValueError, TypeError):
-            raise HTTPException(status_code=400, detail="Invalid weaning weight value")
-
-    # Handle current_weight validation
-    current_weight = None
-    if body.currentWeight is not None:
-        try:
-            current_weight = float(body.currentWeight)
-            if not (0 <= current_weight <= 10000):
-                raise HTTPException(status_code=400, detail="Current weight must be between 0 and 10000 kg")
-        except (ValueError, TypeError):
-            raise HTTPException(status_code=400, detail="Invalid current weight value")
-
-    # Auto-assign insemination_round_id if missing and born_date is provided
-    if not insemination_round_id and body.bornDate:
-        auto_assigned_round_id = _auto_assign_insemination_round_id(body.bornDate, company_id)
-        if auto_assigned_round_id:
-            insemination_round_id = _normalize_text(auto_assigned_round_id)
+    mother_weight = _parse_bounded_float(body.motherWeight, "Mother weight", 10000, "kg")
+    weaning_weight = _parse_bounded_float(body.weaningWeight, "Weaning weight", 10000, "kg")
+    current_weight = _parse_bounded_float(body.currentWeight, "Current weight", 10000, "kg")
 
     if gender and gender not in VALID_GENDERS:
-        raise HTTPException(status_code=400, detail=f"Invalid gender. Must be one of: {', '.join(VALID_GENDERS)}")
+        raise HTTPException(status_code=400, detail=_GENDER_ERR)
     if status and status not in VALID_STATUSES:
-        raise HTTPException(status_code=400, detail=f"Invalid status. Must be one of: {', '.join(VALID_STATUSES)}")
+        raise HTTPException(status_code=400, detail=_STATUS_ERR)
     if color and color not in VALID_COLORS:
-        raise HTTPException(status_code=400, detail=f"Invalid color. Must be one of: {', '.join(VALID_COLORS)}")
+        raise HTTPException(status_code=400, detail=_COLOR_ERR)
 
     # Handle optional death_date (YYYY-MM-DD)
     death_date = None
-    if hasattr(body, "deathDate") and body.deathDate:
+    if body.deathDate:
         try:
-            _dt.datetime.strptime(body.deathDate, "%Y-%m-%d")
+            _parse_ymd(body.deathDate)
             death_date = body.deathDate
         except ValueError:
             raise HTTPException(status_code=400, detail="Invalid deathDate format. Use YYYY-MM-DD")
@@ -210,9 +348,9 @@ def insert_registration(created_by_or_key: str, body, company_id: int = None) ->
 
     # Handle optional sold_date (YYYY-MM-DD)
     sold_date = None
-    if hasattr(body, "soldDate") and body.soldDate:
+    if body.soldDate:
         try:
-            _dt.datetime.strptime(body.soldDate, "%Y-%m-%d")
+            _parse_ymd(body.soldDate)
             sold_date = body.soldDate
         except ValueError:
             raise HTTPException(status_code=400, detail="Invalid soldDate format. Use YYYY-MM-DD")
@@ -221,12 +359,176 @@ def insert_registration(created_by_or_key: str, body, company_id: int = None) ->
     if status == "SOLD" and not sold_date:
         sold_date = _dt.datetime.utcnow().strftime("%Y-%m-%d")
 
+    return {
+        "animal_number": animal,
+        "mother_id": mother,
+        "father_id": father,
+        "born_date": body.bornDate,
+        "weight": weight,
+        "current_weight": current_weight,
+        "gender": gender,
+        "animal_type": animal_type,
+        "status": status,
+        "color": color,
+        "notes": notes,
+        "notes_mother": notes_mother,
+        "insemination_round_id": insemination_round_id,
+        "insemination_identifier": insemination_identifier,
+        "scrotal_circumference": scrotal_circumference,
+        "rp_animal": rp_animal,
+        "rp_mother": rp_mother,
+        "mother_weight": mother_weight,
+        "weaning_weight": weaning_weight,
+        "death_date": death_date,
+        "sold_date": sold_date,
+        "animal_idv": animal_idv,
+    }
+
+def _prepare_registration(body, company_id: int | None) -> dict:
+    """Validate a RegisterBody for insert: adds created_at and the auto-assigned insemination round."""
+    fields = _validate_registration_body(body)
+
+    created_at = body.createdAt if (body.createdAt and isinstance(body.createdAt, str)) else None
+    fields["created_at"] = created_at or _dt.datetime.utcnow().isoformat()
+
+    # Auto-assign insemination_round_id if missing and born_date is provided
+    if not fields["insemination_round_id"] and body.bornDate:
+        auto_assigned_round_id = _auto_assign_insemination_round_id(body.bornDate, company_id)
+        if auto_assigned_round_id:
+            fields["insemination_round_id"] = _normalize_text(auto_assigned_round_id)
+    return fields
+
+# Fields _insert_registration diffs against an animal's existing events, with the
+# event emitted when the value changes (resolved once at import)
+_INSERT_FIELD_EVENTS = (
+    ('weight', EventType.WEIGHT_RECORDED),
+    ('current_weight', EventType.CURRENT_WEIGHT_RECORDED),
+    ('gender', EventType.GENDER_CORRECTED),
+    ('status', EventType.STATUS_CHANGED),
+    ('color', EventType.COLOR_RECORDED),
+    ('notes', EventType.NOTES_UPDATED),
+    ('rp_animal', EventType.RP_ANIMAL_UPDATED),
+)
+_EVENT_OLD_VALUE_FIELDS = tuple(field for field, _ in _INSERT_FIELD_EVENTS)
+
+# Fields _update_registration_core diffs against the stored row, with the event
+# emitted when a provided value differs
+_UPDATE_FIELD_EVENTS = (
+    ('weight', EventType.WEIGHT_RECORDED),
+    ('weaning_weight', EventType.WEANING_WEIGHT_RECORDED),
+    ('current_weight', EventType.CURRENT_WEIGHT_RECORDED),
+    ('mother_id', EventType.MOTHER_ASSIGNED),
+    ('father_id', EventType.FATHER_ASSIGNED),
+    ('gender', EventType.GENDER_CORRECTED),
+    ('color', EventType.COLOR_RECORDED),
+    ('animal_number', EventType.ANIMAL_NUMBER_CORRECTED),
+    ('born_date', EventType.BIRTH_DATE_CORRECTED),
+    ('animal_idv', EventType.ANIMAL_IDV_UPDATED),
+    ('notes', EventType.NOTES_UPDATED),
+    ('notes_mother', EventType.MOTHER_NOTES_UPDATED),
+    ('rp_animal', EventType.RP_ANIMAL_UPDATED),
+    ('rp_mother', EventType.RP_MOTHER_UPDATED),
+    ('mother_weight', EventType.MOTHER_WEIGHT_RECORDED),
+    ('scrotal_circumference', EventType.SCROTAL_CIRCUMFERENCE_RECORDED),
+)
+
+# Fields update_animal_by_number recovers from event payloads when the animal has no snapshot
+_BY_NUMBER_EVENT_FALLBACK_FIELDS = (
+    'current_weight', 'notes', 'status', 'color', 'rp_animal', 'notes_mother', 'animal_idv',
+)
+# Newest non-null payload value per field, extracted by SQLite's JSON functions so
+# no payload is decoded in Python
+_BY_NUMBER_EVENT_FALLBACK_SQL = "SELECT " + ", ".join(
+    f"""(SELECT json_extract(payload, '$.{field}') FROM domain_events
+        WHERE animal_number = ?1 AND company_id = ?2
+          AND json_extract(payload, '$.{field}') IS NOT NULL
+        ORDER BY event_time DESC, id DESC LIMIT 1)"""
+    for field in _BY_NUMBER_EVENT_FALLBACK_FIELDS
+)
+
+# Mother registration refreshes: a fixed statement per shape, NULL keeps the
+# stored value (rp_mother is stored as the mother's rp_animal)
+_MOTHER_REG_UPDATE_BY_NUMBER_SQL = """
+    UPDATE registrations
+    SET notes_mother = COALESCE(?, notes_mother),
+        current_weight = COALESCE(?, current_weight),
+        rp_animal = COALESCE(?, rp_animal),
+        updated_at = datetime('now')
+    WHERE id = (
+        SELECT id FROM registrations
+        WHERE animal_number = ? AND company_id = ?
+        LIMIT 1
+    )
+"""
+_MOTHER_REG_UPDATE_BY_ID_SQL = """
+    UPDATE registrations
+    SET notes_mother = COALESCE(?, notes_mother),
+        current_weight = COALESCE(?, current_weight),
+        updated_at = datetime('now')
+    WHERE id = ?
+"""
+
+# Mother's (animal_id, notes_mother, current_weight, rp_animal): the snapshot row
+# wins over the registration row, in one statement
+_MOTHER_PROFILE_SQL = """
+    SELECT animal_id, notes_mother, current_weight, rp_animal FROM (
+        SELECT animal_id, notes_mother, current_weight, rp_animal, 0 AS prio
+        FROM animal_snapshots
+        WHERE animal_number = ? AND company_id = ?
+        UNION ALL
+        SELECT id, notes_mother, current_weight, rp_animal, 1 AS prio
+        FROM registrations
+        WHERE animal_number = ? AND company_id = ?
+    )
+    ORDER BY prio
+    LIMIT 1
+"""
+
+def _load_mother_profile(mother: str, company_id: int) -> tuple:
+    """Return (animal_id, notes_mother, current_weight, rp_animal) for a mother; all None if unknown."""
+    row = conn.execute(_MOTHER_PROFILE_SQL, (mother, company_id, mother, company_id)).fetchone()
+    return tuple(row) if row else (None, None, None, None)
+
+@with_write_lock
+def insert_registration(created_by_or_key: str, body, company_id: int = None) -> None:
+    fields = _prepare_registration(body, company_id)
+    # The birth event, the snapshot projections and the mother/father ensures each
+    # commit on their own; one batch makes the whole registration a single commit.
+    # Relies on db.py opening conn with WAL + synchronous=NORMAL: that commit doesn't
+    # fsync the database file and export/stats readers don't block it.
+    with batch_transaction():
+        return _insert_registration(created_by_or_key, body, fields, company_id)
+
+def _insert_registration(created_by_or_key: str, body, fields: dict, company_id: int | None) -> int:
+    animal = fields["animal_number"]
+    created_at = fields["created_at"]
+    mother = fields["mother_id"]
+    father = fields["father_id"]
+    weight = fields["weight"]
+    current_weight = fields["current_weight"]
+    gender = fields["gender"]
+    status = fields["status"]
+    color = fields["color"]
+    notes = fields["notes"]
+    notes_mother = fields["notes_mother"]
+    insemination_round_id = fields["insemination_round_id"]
+    insemination_identifier = fields["insemination_identifier"]
+    scrotal_circumference = fields["scrotal_circumference"]
+    rp_animal = fields["rp_animal"]
+    rp_mother = fields["rp_mother"]
+    mother_weight = fields["mother_weight"]
+    weaning_weight = fields["weaning_weight"]
+    animal_idv = fields["animal_idv"]
+
     try:
-        with conn:
+        with write_transaction():
             # Check if animal has domain events indicating it's a mother/father
             # Mothers/fathers should NOT be in registrations table
             if company_id:
-                existing_events = get_events_for_animal_by_number(animal, company_id)
+                # One query for the animal's and the mother's events; neither list
+                # changes before it is consumed below (the reserve INSERT emits none).
+                events_by_number = get_events_for_animals_by_number((animal, mother), company_id)
+                existing_events = events_by_number[animal]
                 if len(existing_events) > 0:
                     # Check if this is a mother_registered or father_registered event
                     for event in existing_events:
@@ -251,73 +553,49 @@ def insert_registration(created_by_or_key: str, body, company_id: int = None) ->
                 INSERT INTO registrations (
                     animal_number, created_at, created_by, company_id, short_id
                 )
-                VALUES (?, ?, ?, ?, substr(replace(hex(randomblob(16)), 'E', ''), 1, 10))
+                VALUES (?, ?, ?, ?, ?)
+                RETURNING id
                 """,
-                (animal, created_at, created_by_or_key, company_id)
+                (animal, created_at, created_by_or_key, company_id, generate_short_id())
             )
-            animal_id = cursor.lastrowid
+            animal_id = cursor.fetchone()[0]
             
             # Step 2: Emit domain event FIRST (source of truth)
             if company_id:
                 try:
                     # Check if animal already has domain events (e.g., mother_registered, father_registered)
-                    existing_events = get_events_for_animal_by_number(animal, company_id)
-                    
                     if len(existing_events) > 0:
                         # Animal already has events - emit update events instead of birth_registered
-                        old_values = {
-                            'weight': None,
-                            'current_weight': None,
-                            'gender': None,
-                            'status': None,
-                            'color': None,
-                            'notes': None,
-                            'rp_animal': None,
-                        }
-                        
-                        # Extract old values from existing events
+                        # Extract old values from existing events: the earliest event
+                        # carrying a truthy value for a field wins; stop once all are found.
+                        old_values = dict.fromkeys(_EVENT_OLD_VALUE_FIELDS)
+                        missing = set(_EVENT_OLD_VALUE_FIELDS)
                         for event in existing_events:
-                            if event.get('payload'):
-                                payload = event['payload'] if isinstance(event['payload'], dict) else json.loads(event['payload'])
-                                if not old_values['weight'] and payload.get('weight'):
-                                    old_values['weight'] = payload.get('weight')
-                                if not old_values['current_weight'] and payload.get('current_weight'):
-                                    old_values['current_weight'] = payload.get('current_weight')
-                                if not old_values['gender'] and payload.get('gender'):
-                                    old_values['gender'] = payload.get('gender')
-                                if not old_values['status'] and payload.get('status'):
-                                    old_values['status'] = payload.get('status')
-                                if not old_values['color'] and payload.get('color'):
-                                    old_values['color'] = payload.get('color')
-                                if not old_values['notes'] and payload.get('notes'):
-                                    old_values['notes'] = payload.get('notes')
-                                if not old_values['rp_animal'] and payload.get('rp_animal'):
-                                    old_values['rp_animal'] = payload.get('rp_animal')
+                            payload = event.get('payload')
+                            if not payload:
+                                continue
+                            if not isinstance(payload, dict):
+                                payload = json.loads(payload)
+                            found = [k for k in missing if payload.get(k)]
+                            for k in found:
+                                old_values[k] = payload[k]
+                            missing.difference_update(found)
+                            if not missing:
+                                break
                         
                         # Emit update events for changed fields
-                        field_changes = [
-                            ('weight', old_values['weight'], weight, EventType.WEIGHT_RECORDED),
-                            ('current_weight', old_values['current_weight'], current_weight, EventType.CURRENT_WEIGHT_RECORDED),
-                            ('gender', old_values['gender'], gender, EventType.GENDER_CORRECTED),
-                            ('status', old_values['status'], status, EventType.STATUS_CHANGED),
-                            ('color', old_values['color'], color, EventType.COLOR_RECORDED),
-                            ('notes', old_values['notes'], notes, EventType.NOTES_UPDATED),
-                            ('rp_animal', old_values['rp_animal'], rp_animal, EventType.RP_ANIMAL_UPDATED),
-                        ]
-                        
-                        for field_name, old_val, new_val, event_type in field_changes:
-                            if old_val != new_val and new_val is not None:
-                                emit_field_change(
-                                    event_type=event_type,
-                                    animal_id=animal_id,
-                                    animal_number=animal,
-                                    company_id=company_id,
-                                    user_id=created_by_or_key,
-                                    field_name=field_name,
-                                    old_value=old_val,
-                                    new_value=new_val,
-                                    notes=f"Actualizado desde registro",
-                                )
+                        emit_field_changes_batch(
+                            animal_id=animal_id,
+                            animal_number=animal,
+                            company_id=company_id,
+                            user_id=created_by_or_key,
+                            changes=[
+                                (event_type, field_name, old_values[field_name], fields[field_name])
+                                for field_name, event_type in _INSERT_FIELD_EVENTS
+                                if fields[field_name] is not None and old_values[field_name] != fields[field_name]
+                            ],
+                            notes="Actualizado desde registro",
+                        )
                     else:
                         # Animal has no events - emit birth_registered (SOURCE OF TRUTH)
                         emit_birth_registered(
@@ -345,11 +623,11 @@ def insert_registration(created_by_or_key: str, body, company_id: int = None) ->
                             animal_idv=animal_idv,
                         )
                     
-                    # Step 3: Project snapshot (derived from events)
-                    project_animal_snapshot(animal_id, company_id)
+                    # Step 3: Project snapshot (derived from events); the projector returns
+                    # the state it just saved, so there is no need to read it back
+                    snapshot = project_animal_snapshot(animal_id, company_id)
                     
                     # Step 4: Project registration from snapshot (derived, for backwards compatibility)
-                    snapshot = get_snapshot(animal_id, company_id)
                     if snapshot:
                         project_registration_from_snapshot(
                             animal_id=animal_id,
@@ -361,134 +639,60 @@ def insert_registration(created_by_or_key: str, body, company_id: int = None) ->
                     # Handle mother events (if mother_id provided)
                     if mother and company_id:
                         try:
-                            # Check if mother already has events
-                            mother_events = get_events_for_animal_by_number(mother, company_id)
+                            # Check if mother already has events (re-read if the animal is
+                            # its own mother, since its events were just emitted)
+                            if mother == animal:
+                                mother_has_events = animal_has_events_by_number(mother, company_id)
+                            else:
+                                mother_has_events = bool(events_by_number[mother])
                             
-                            if len(mother_events) > 0:
-                                # Mother already has events - emit updates for notes_mother, current_weight, and rp_animal
-                                # Get mother's current values from snapshot (source of truth)
-                                mother_snapshot = get_snapshot_by_number(mother, company_id)
-                                
-                                if mother_snapshot:
-                                    # Use snapshot values
-                                    old_rp_animal = mother_snapshot.get('rp_animal')
-                                    old_current_weight = mother_snapshot.get('current_weight')
-                                    old_notes_mother = mother_snapshot.get('notes_mother')
-                                    mother_animal_id = mother_snapshot.get('animal_id')  # May be None for mothers
-                                else:
-                                    # Fallback to registration table if snapshot doesn't exist
-                                    mother_cursor = conn.execute(
-                                        """
-                                        SELECT id, notes_mother, current_weight, rp_animal FROM registrations 
-                                        WHERE animal_number = ? AND company_id = ?
-                                        LIMIT 1
-                                        """,
-                                        (mother, company_id)
+                            if mother_has_events:
+                                # Existing mother: the profile read, events and registration
+                                # refresh only matter when the birth carries mother data
+                                if notes_mother or mother_weight is not None or rp_mother:
+                                    # Mother already has events - emit updates for notes_mother, current_weight, and rp_animal
+                                    # Current values come from the snapshot (source of truth), falling
+                                    # back to the registration row; defaults if neither exists.
+                                    mother_animal_id, old_notes_mother, old_current_weight, old_rp_animal = (
+                                        _load_mother_profile(mother, company_id)
                                     )
-                                    mother_reg = mother_cursor.fetchone()
-                                    
-                                    if mother_reg:
-                                        mother_animal_id = mother_reg[0]
-                                        old_notes_mother = mother_reg[1]
-                                        old_current_weight = mother_reg[2]
-                                        old_rp_animal = mother_reg[3] if len(mother_reg) > 3 else None
-                                    else:
-                                        # No snapshot and no registration - use defaults
-                                        mother_animal_id = None
-                                        old_rp_animal = None
-                                        old_current_weight = None
-                                        old_notes_mother = None
-                                
-                                # Also check if mother has registration record (for updating registration table later)
-                                mother_reg_cursor = conn.execute(
-                                    """
-                                    SELECT id FROM registrations 
-                                    WHERE animal_number = ? AND company_id = ?
-                                    LIMIT 1
-                                    """,
-                                    (mother, company_id)
-                                )
-                                mother_reg = mother_reg_cursor.fetchone()
                                 
-                                # Track if any events were emitted
-                                events_emitted = False
-                                
-                                # Emit MOTHER_NOTES_UPDATED event if notes_mother is provided and different
-                                if notes_mother and notes_mother != old_notes_mother:
-                                    emit_field_change(
-                                        event_type=EventType.MOTHER_NOTES_UPDATED,
+                                    # Changes for notes_mother, current_weight and rp_animal,
+                                    # emitted together as one batch
+                                    changes = []
+                                    if notes_mother and notes_mother != old_notes_mother:
+                                        changes.append((EventType.MOTHER_NOTES_UPDATED, 'notes_mother', old_notes_mother or None, notes_mother))
+                                    if mother_weight is not None and mother_weight != old_current_weight:
+                                        changes.append((
+                                            EventType.CURRENT_WEIGHT_RECORDED, 'current_weight',
+                                            str(old_current_weight) if old_current_weight is not None else None,
+                                            str(mother_weight),
+                                        ))
+                                    if rp_mother and rp_mother != old_rp_animal:
+                                        changes.append((EventType.RP_ANIMAL_UPDATED, 'rp_animal', old_rp_animal or None, rp_mother))
+                                    events_emitted = emit_field_changes_batch(
                                         animal_id=mother_animal_id,  # Can be None
                                         animal_number=mother,
                                         company_id=company_id,
                                         user_id=created_by_or_key,
-                                        field_name='notes_mother',
-                                        old_value=old_notes_mother or None,
-                                        new_value=notes_mother,
+                                        changes=changes,
                                         notes=f"Actualizado desde registro de cría {animal}",
-                                    )
-                                    events_emitted = True
+                                    ) > 0
                                 
-                                # Emit CURRENT_WEIGHT_RECORDED event if mother_weight is provided and different
-                                if mother_weight is not None and mother_weight != old_current_weight:
-                                    emit_field_change(
-                                        event_type=EventType.CURRENT_WEIGHT_RECORDED,
-                                        animal_id=mother_animal_id,  # Can be None
-                                        animal_number=mother,
-                                        company_id=company_id,
-                                        user_id=created_by_or_key,
-                                        field_name='current_weight',
-                                        old_value=str(old_current_weight) if old_current_weight is not None else None,
-                                        new_value=str(mother_weight),
-                                        notes=f"Actualizado desde registro de cría {animal}",
-                                    )
-                                    events_emitted = True
+                                    # Project snapshot ONCE after all events
+                                    if events_emitted:
+                                        if mother_animal_id:
+                                            project_animal_snapshot(mother_animal_id, company_id)
+                                        else:
+                                            project_animal_snapshot_by_number(mother, company_id)
                                 
-                                # Emit RP_ANIMAL_UPDATED event if rp_mother is provided and different
-                                if rp_mother and rp_mother != old_rp_animal:
-                                    emit_field_change(
-                                        event_type=EventType.RP_ANIMAL_UPDATED,
-                                        animal_id=mother_animal_id,  # Can be None
-                                        animal_number=mother,
-                                        company_id=company_id,
-                                        user_id=created_by_or_key,
-                                        field_name='rp_animal',
-                                        old_value=old_rp_animal or None,
-                                        new_value=rp_mother,
-                                        notes=f"Actualizado desde registro de cría {animal}",
+                                    # Update mother's registration ONLY if registration exists.
+                                    # The existence check lives in the UPDATE's WHERE clause; a
+                                    # missing registration simply matches zero rows.
+                                    conn.execute(
+                                        _MOTHER_REG_UPDATE_BY_NUMBER_SQL,
+                                        (notes_mother or None, mother_weight, rp_mother or None, mother, company_id),
                                     )
-                                    events_emitted = True
-                                
-                                # Project snapshot ONCE after all events
-                                if events_emitted:
-                                    if mother_animal_id:
-                                        project_animal_snapshot(mother_animal_id, company_id)
-                                    else:
-                                        project_animal_snapshot_by_number(mother, company_id)
-                                
-                                # Update mother's registration ONLY if registration exists
-                                if mother_reg and (notes_mother or mother_weight is not None or rp_mother):
-                                    mother_reg_id = mother_reg[0]
-                                    update_fields = []
-                                    update_values = []
-                                    if notes_mother:
-                                        update_fields.append("notes_mother = ?")
-                                        update_values.append(notes_mother)
-                                    if mother_weight is not None:
-                                        update_fields.append("current_weight = ?")
-                                        update_values.append(mother_weight)
-                                    if rp_mother:
-                                        update_fields.append("rp_animal = ?")  # rp_mother → rp_animal in registration
-                                        update_values.append(rp_mother)
-                                    
-                                    if update_fields:
-                                        update_values.append(mother_reg_id)
-                                        conn.execute(
-                                            f"""
-                                            UPDATE registrations SET {', '.join(update_fields)}, updated_at = datetime('now')
-                                            WHERE id = ?
-                                            """,
-                                            tuple(update_values)
-                                        )
                             else:
                                 # Mother has no events - create them
                                 # First check if mother has a registration record
@@ -507,23 +711,10 @@ def insert_registration(created_by_or_key: str, body, company_id: int = None) ->
                                     mother_animal_id = mother_reg[0]
                                     
                                     # Update mother's registration with new values if provided
-                                    update_fields = []
-                                    update_values = []
-                                    if notes_mother:
-                                        update_fields.append("notes_mother = ?")
-                                        update_values.append(notes_mother)
-                                    if mother_weight is not None:
-                                        update_fields.append("current_weight = ?")
-                                        update_values.append(mother_weight)
-                                    
-                                    if update_fields:
-                                        update_values.append(mother_animal_id)
+                                    if notes_mother or mother_weight is not None:
                                         conn.execute(
-                                            f"""
-                                            UPDATE registrations SET {', '.join(update_fields)}, updated_at = datetime('now')
-                                            WHERE id = ?
-                                            """,
-                                            tuple(update_values)
+                                            _MOTHER_REG_UPDATE_BY_ID_SQL,
+                                            (notes_mother or None, mother_weight, mother_animal_id),
                                         )
                                     
                                     # Create events for mother
@@ -537,9 +728,7 @@ def insert_registration(created_by_or_key: str, body, company_id: int = None) ->
                                         rp_animal=rp_mother,
                                         notes=notes_mother,
                                     )
-                                    
-                                    # Project snapshot for mother after event creation
-                                    project_animal_snapshot(mother_animal_id, company_id)
+                                    # ensure_animal_has_events projects the snapshot via the registration id
                                 else:
                                     # Mother has no registration and no events - just create events
                                     ensure_animal_has_events(
@@ -551,13 +740,10 @@ def insert_registration(created_by_or_key: str, body, company_id: int = None) ->
                                         status='ALIVE',
                                         rp_animal=rp_mother,
                                         notes=notes_mother,
+                                        project_by_number=True,
                                     )
-                                    
-                                    # Project snapshot for mother after event creation (by number since no animal_id)
-                                    project_animal_snapshot_by_number(mother, company_id)
                         except Exception as e:
-                            import logging
-                            logging.warning(f"Failed to handle events for mother {mother}: {e}")
+                            logger.warning(f"Failed to handle events for mother {mother}: {e}")
                     
                     # Ensure father has events (if father_id provided)
                     if father and company_id:
@@ -568,37 +754,19 @@ def insert_registration(created_by_or_key: str, body, company_id: int = None) ->
                                 user_id=created_by_or_key,
                                 gender='MALE',
                                 status='ALIVE',
+                                project_by_number=True,
                             )
-                            
-                            # Project snapshot for father after event creation (by number since no animal_id)
-                            project_animal_snapshot_by_number(father, company_id)
                         except Exception as e:
-                            import logging
-                            logging.warning(f"Failed to ensure events for father {father}: {e}")
+                            logger.warning(f"Failed to ensure events for father {father}: {e}")
                 except Exception as e:
                     # Log but don't fail - triggers still work as backup
-                    import logging
-                    logging.warning(f"Failed to emit birth event for animal {animal_id}: {e}")
+                    logger.warning(f"Failed to emit birth event for animal {animal_id}: {e}")
             else:
                 # Legacy path (no company_id): Update registration directly with all data
                 # No events emitted for legacy registrations
                 conn.execute(
-                    """
-                    UPDATE registrations SET
-                        mother_id = ?, father_id = ?, born_date = ?, weight = ?, current_weight = ?,
-                        gender = ?, animal_type = ?, status = ?, color = ?, notes = ?, notes_mother = ?,
-                        insemination_round_id = ?, insemination_identifier = ?, scrotal_circumference = ?,
-                        rp_animal = ?, rp_mother = ?, mother_weight = ?, weaning_weight = ?,
-                        death_date = ?, sold_date = ?, animal_idv = ?, updated_at = datetime('now')
-                    WHERE id = ?
-                    """,
-                    (
-                        mother, father, body.bornDate, weight, current_weight,
-                        gender, animal_type, status, color, notes, notes_mother,
-                        insemination_round_id, insemination_identifier, scrotal_circumference,
-                        rp_animal, rp_mother, mother_weight, weaning_weight,
-                        death_date, sold_date, animal_idv, animal_id
-                    )
+                    _LEGACY_UPDATE_SQL,
+                    dict(fields, id=animal_id),
                 )
             
             return animal_id
@@ -607,6 +775,48 @@ def insert_registration(created_by_or_key: str, body, company_id: int = None) ->
     except sqlite3.Error as e:
         raise HTTPException(status_code=500, detail=f"DB error: {e}")
 
+@with_write_lock
+def insert_registrations_bulk(created_by_or_key: str, bodies: list, company_id: int | None = None) -> list[int]:
+    """Insert many registrations, validating all of them before writing any.
+
+    Legacy (no company) rows go in as chunked multi-row INSERT ... RETURNING
+    statements inside one transaction, so the whole batch costs one commit. Company rows go through
+    _insert_registration one by one (each animal needs its own events and
+    snapshot projection) inside one batch_transaction, so they also commit
+    once and a failing row rolls back the whole batch.
+    """
+    prepared = [_prepare_registration(body, company_id) for body in bodies]
+    if company_id:
+        with batch_transaction():
+            return [
+                _insert_registration(created_by_or_key, body, fields, company_id)
+                for body, fields in zip(bodies, prepared)
+            ]
+
+    if not prepared:
+        return []
+    rows = [
+        tuple(fields[col] for col in _BULK_INSERT_COLUMNS) + (created_by_or_key, generate_short_id())
+        for fields in prepared
+    ]
+    ids_by_short_id = {}
+    try:
+        with conn:
+            for start in range(0, len(rows), _BULK_INSERT_CHUNK):
+                chunk = rows[start:start + _BULK_INSERT_CHUNK]
+                cursor = conn.execute(
+                    _bulk_insert_sql(len(chunk)),
+                    [value for row in chunk for value in row],
+                )
+                # RETURNING order isn't guaranteed; short_id is unique per row
+                ids_by_short_id.update((short_id, record_id) for record_id, short_id in cursor.fetchall())
+        return [ids_by_short_id[row[-1]] for row in rows]
+    except sqlite3.IntegrityError:
+        raise HTTPException(status_code=409, detail="Duplicate registration for this animal and mother")
+    except sqlite3.Error as e:
+        raise HTTPException(status_code=500, detail=f"DB error: {e}")
+
+@with_write_lock
 def delete_registration(user_id: str, animal_number: str, created_at: str | None, company_id: int) -> None:
     """Delete an animal registration using event-first pattern.
     
@@ -616,6 +826,7 @@ def delete_registration(user_id: str, animal_number: str, created_at: str | None
     4. Delete from registrations table
     """
     animal_number = _normalize_text(animal_number)
+    created_at = (created_at or "").strip() or None
     if not animal_number:
         raise HTTPException(status_code=400, detail="Animal number required")
     
@@ -671,6 +882,7 @@ def delete_registration(user_id: str, animal_number: str, created_at: str | None
     except sqlite3.Error as e:
         raise HTTPException(status_code=500, detail=f"DB error: {e}")
 
+@with_write_lock
 def update_registration(created_by_or_key: str, animal_id: int, body, company_id: int | None = None) -> None:
     """Update an existing registration record.
     Requires company_id - only users within the same company can update records.
@@ -679,155 +891,74 @@ def update_registration(created_by_or_key: str, animal_id: int, body, company_id
     if not company_id:
         raise HTTPException(status_code=403, detail="Company assignment required to update records")
     
-    if not body.animalNumber:
-        raise HTTPException(status_code=400, detail="animalNumber required")
+    _update_registration_core(created_by_or_key, "id = ?", (animal_id,), body, company_id)
 
-    animal = _normalize_text(body.animalNumber)
-    mother = _normalize_text(body.motherId)
-    father = _normalize_text(body.fatherId)
-    animal_idv = _normalize_text(body.animalIdv) if hasattr(body, 'animalIdv') else None
-
-    weight = None
-    if body.weight is not None:
-        try:
-            weight = float(body.weight)
-            if not (0 <= weight <= 10000):
-                raise HTTPException(status_code=400, detail="Weight must be between 0 and 10000 kg")
-        except (ValueError, TypeError):
-            raise HTTPException(status_code=400, detail="Invalid weight value")
-
-    scrotal_circumference = None
-    if body.scrotalCircumference is not None:
-        try:
-            scrotal_circumference = float(body.scrotalCircumference)
-            if not (0 <= scrotal_circumference <= 100):
-                raise HTTPException(status_code=400, detail="Scrotal circumference must be between 0 and 100 cm")
-        except (ValueError, TypeError):
-            raise HTTPException(status_code=400, detail="Invalid scrotal circumference value")
-
-    gender = _normalize_text(body.gender)
-    
-    # Determine animal_type based on gender
-    animal_type = None
-    if gender:
-        if gender == 'FEMALE':
-            animal_type = 1  # Cow
-        elif gender == 'MALE':
-            animal_type = 2  # Bull
-        # UNKNOWN gender will have animal_type = None
-    
-    status = _normalize_text(body.status)
-    color = _normalize_text(body.color)
-    notes = _normalize_text(body.notes)
-    notes_mother = _normalize_text(body.notesMother)
-    insemination_round_id = _normalize_text(body.inseminationRoundId)
-    insemination_identifier = _normalize_text(body.inseminationIdentifier)
-    rp_animal = _normalize_text(body.rpAnimal)
-    rp_mother = _normalize_text(body.rpMother)
-
-    # Handle mother_weight validation
-    mother_weight = None
-    if body.motherWeight is not None:
-        try:
-            mother_weight = float(body.motherWeight)
-            if not (0 <= mother_weight <= 10000):
-                raise HTTPException(status_code=400, detail="Mother weight must be between 0 and 10000 kg")
-        except (ValueError, TypeError):
-            raise HTTPException(status_code=400, detail="Invalid mother weight value")
-
-    # Handle weaning_weight validation
-    weaning_weight = None
-    if body.weaningWeight is not None:
-        try:
-            weaning_weight = float(body.weaningWeight)
-            if not (0 <= weaning_weight <= 10000):
-                raise HTTPException(status_code=400, detail="Weaning weight must be between 0 and 10000 kg")
-        except (ValueError, TypeError):
-            raise HTTPException(status_code=400, detail="Invalid weaning weight value")
-
-    # Handle current_weight validation
-    current_weight = None
-    if body.currentWeight is not None:
-        try:
-            current_weight = float(body.currentWeight)
-            if not (0 <= current_weight <= 10000):
-                raise HTTPException(status_code=400, detail="Current weight must be between 0 and 10000 kg")
-        except (ValueError, TypeError):
-            raise HTTPException(status_code=400, detail="Invalid current weight value")
-
-    if gender and gender not in VALID_GENDERS:
-        raise HTTPException(status_code=400, detail=f"Invalid gender. Must be one of: {', '.join(VALID_GENDERS)}")
-    if status and status not in VALID_STATUSES:
-        raise HTTPException(status_code=400, detail=f"Invalid status. Must be one of: {', '.join(VALID_STATUSES)}")
-    if color and color not in VALID_COLORS:
-        raise HTTPException(status_code=400, detail=f"Invalid color. Must be one of: {', '.join(VALID_COLORS)}")
-
-    # Handle optional death_date (YYYY-MM-DD)
-    death_date = None
-    if hasattr(body, "deathDate") and body.deathDate:
-        try:
-            _dt.datetime.strptime(body.deathDate, "%Y-%m-%d")
-            death_date = body.deathDate
-        except ValueError:
-            raise HTTPException(status_code=400, detail="Invalid deathDate format. Use YYYY-MM-DD")
-
-    # Handle optional sold_date (YYYY-MM-DD)
-    sold_date = None
-    if hasattr(body, "soldDate") and body.soldDate:
-        try:
-            _dt.datetime.strptime(body.soldDate, "%Y-%m-%d")
-            sold_date = body.soldDate
-        except ValueError:
-            raise HTTPException(status_code=400, detail="Invalid soldDate format. Use YYYY-MM-DD")
-
-    # Auto-set death_date if status is DEAD and not provided
-    if status == "DEAD" and not death_date:
-        death_date = _dt.datetime.utcnow().strftime("%Y-%m-%d")
 
-    # Auto-set sold_date if status is SOLD and not provided
-    if status == "SOLD" and not sold_date:
-        sold_date = _dt.datetime.utcnow().strftime("%Y-%m-%d")
+def _update_registration_core(
+    created_by_or_key: str,
+    where_clause: str,
+    where_params: tuple,
+    body,
+    company_id: int,
+) -> int:
+    """Update the registration matched by where_clause within company_id.
+    The old-values SELECT doubles as the existence/ownership check, so callers
+    selecting by id or by (animal_number, created_at) share one lookup.
+    Returns the updated registration id; raises 404 when nothing matches.
+    """
+    fields = _validate_registration_body(body)
+    animal = fields["animal_number"]
+    mother = fields["mother_id"]
+    father = fields["father_id"]
+    status = fields["status"]
+    notes = fields["notes"]
+    insemination_round_id = fields["insemination_round_id"]
+    rp_mother = fields["rp_mother"]
+    mother_weight = fields["mother_weight"]
 
     try:
-        with conn:
-            # Check if record exists and belongs to the same company, and get current values
-            cursor = conn.execute(
-                """
-                SELECT company_id, animal_number, mother_id, father_id, born_date, weight, current_weight,
+        # BEGIN IMMEDIATE before the old-values SELECT, so no other writer can change
+        # the row between the read and the update; the events and projections
+        # below join this transaction instead of committing on their own.
+        with batch_transaction():
+            # Check if record exists and belongs to the same company, and get current values.
+            # sqlite3.Row lets the row become the old-values mapping directly. The
+            # registration id of the (new) mother rides along so the mother-weight
+            # event below doesn't need its own lookup.
+            cursor = conn.cursor()
+            cursor.row_factory = sqlite3.Row
+            record = cursor.execute(
+                f"""
+                SELECT id, animal_number, mother_id, father_id, born_date, weight, current_weight,
                        gender, status, color, notes, notes_mother, rp_animal, rp_mother,
-                       mother_weight, weaning_weight, scrotal_circumference, death_date, sold_date, animal_idv, created_at
+                       mother_weight, weaning_weight, scrotal_circumference, death_date, sold_date, animal_idv, created_at,
+                       (SELECT m.id FROM registrations m
+                        WHERE m.animal_number = ? AND m.company_id = ?
+                        LIMIT 1) AS mother_reg_id
                 FROM registrations 
-                WHERE id = ? AND company_id = ?
+                WHERE {where_clause} AND company_id = ?
                 """,
-                (animal_id, company_id)
-            )
-            record = cursor.fetchone()
+                (mother, company_id, *where_params, company_id)
+            ).fetchone()
             if not record:
                 raise HTTPException(status_code=404, detail="Record not found or access denied")
+            animal_id = record["id"]
             
             # Store old values for event emission
-            old_values = {
-                'animal_number': record[1],
-                'mother_id': record[2],
-                'father_id': record[3],
-                'born_date': record[4],
-                'weight': record[5],
-                'current_weight': record[6],
-                'gender': record[7],
-                'status': record[8],
-                'color': record[9],
-                'notes': record[10],
-                'notes_mother': record[11],
-                'rp_animal': record[12],
-                'rp_mother': record[13],
-                'mother_weight': record[14],
-                'weaning_weight': record[15],
-                'scrotal_circumference': record[16],
-                'death_date': record[17] if len(record) > 17 else None,
-                'sold_date': record[18] if len(record) > 18 else None,
-                'animal_idv': record[19] if len(record) > 19 else None,
-                'created_at': record[20] if len(record) > 20 else None,
-            }
+            old_values = dict(record)
+            mother_reg_id = old_values.pop("mother_reg_id")
+            
+            # (event_type, field, old, new) for every provided field that differs
+            field_changes = [
+                (event_type, field_name, old_values[field_name], fields[field_name])
+                for field_name, event_type in _UPDATE_FIELD_EVENTS
+                if fields[field_name] is not None and old_values[field_name] != fields[field_name]
+            ]
+            
+            # A PUT that repeats the stored values would emit no events; skip the
+            # projections and writes entirely.
+            if old_values['status'] == status and not field_changes:
+                return animal_id
             
             # Auto-assign insemination_round_id if missing and born_date is provided
             if not insemination_round_id and body.bornDate:
@@ -845,35 +976,17 @@ def update_registration(created_by_or_key: str, animal_id: int, body, company_id
             # Step 1: Emit domain events FIRST (source of truth)
             if company_id:
                 try:
-                    # Map of field -> (old_value, new_value, event_type)
-                    field_changes = [
-                        ('weight', old_values['weight'], weight, EventType.WEIGHT_RECORDED),
-                        ('weaning_weight', old_values['weaning_weight'], weaning_weight, EventType.WEANING_WEIGHT_RECORDED),
-                        ('current_weight', old_values['current_weight'], current_weight, EventType.CURRENT_WEIGHT_RECORDED),
-                        ('mother_id', old_values['mother_id'], mother, EventType.MOTHER_ASSIGNED),
-                        ('father_id', old_values['father_id'], father, EventType.FATHER_ASSIGNED),
-                        ('gender', old_values['gender'], gender, EventType.GENDER_CORRECTED),
-                        ('color', old_values['color'], color, EventType.COLOR_RECORDED),
-                        ('animal_number', old_values['animal_number'], animal, EventType.ANIMAL_NUMBER_CORRECTED),
-                        ('born_date', old_values['born_date'], body.bornDate, EventType.BIRTH_DATE_CORRECTED),
-                        ('animal_idv', old_values['animal_idv'], animal_idv, EventType.ANIMAL_IDV_UPDATED),
-                        ('notes', old_values['notes'], notes, EventType.NOTES_UPDATED),
-                        ('notes_mother', old_values['notes_mother'], notes_mother, EventType.MOTHER_NOTES_UPDATED),
-                        ('rp_animal', old_values['rp_animal'], rp_animal, EventType.RP_ANIMAL_UPDATED),
-                        ('rp_mother', old_values['rp_mother'], rp_mother, EventType.RP_MOTHER_UPDATED),
-                        ('mother_weight', old_values['mother_weight'], mother_weight, EventType.MOTHER_WEIGHT_RECORDED),
-                        ('scrotal_circumference', old_values['scrotal_circumference'], scrotal_circumference, EventType.SCROTAL_CIRCUMFERENCE_RECORDED),
-                    ]
+                    # Field change events, written with one executemany after the loop
+                    changes = []
                     
                     # Special handling for status -> death
                     if old_values['status'] != status:
                         if status == 'DEAD':
                             # Prefer user-provided deathDate (YYYY-MM-DD) if available
                             death_event_time = None
-                            if hasattr(body, "deathDate") and body.deathDate:
+                            if body.deathDate:
                                 try:
-                                    parsed = _dt.datetime.strptime(body.deathDate, "%Y-%m-%d")
-                                    death_event_time = parsed.isoformat()
+                                    death_event_time = _dt.datetime.combine(_parse_ymd(body.deathDate), _dt.time()).isoformat()
                                 except ValueError:
                                     death_event_time = _dt.datetime.utcnow().isoformat()
                             else:
@@ -890,33 +1003,19 @@ def update_registration(created_by_or_key: str, animal_id: int, body, company_id
                             )
                         else:
                             # For SOLD and other status changes, use STATUS_CHANGED event
-                            emit_field_change(
-                                event_type=EventType.STATUS_CHANGED,
-                                animal_id=animal_id,
-                                animal_number=animal,
-                                company_id=company_id,
-                                user_id=created_by_or_key,
-                                field_name='status',
-                                old_value=old_values['status'],
-                                new_value=status,
-                                notes=notes,
-                            )
+                            changes.append((EventType.STATUS_CHANGED, 'status', old_values['status'], status))
                     
                     # Emit events for other field changes
                     # Only emit if new value is provided (not None) AND different from old
-                    for field_name, old_val, new_val, event_type in field_changes:
-                        if new_val is not None and old_val != new_val:
-                            emit_field_change(
-                                event_type=event_type,
-                                animal_id=animal_id,
-                                animal_number=animal,
-                                company_id=company_id,
-                                user_id=created_by_or_key,
-                                field_name=field_name,
-                                old_value=old_val,
-                                new_value=new_val,
-                                notes=notes,
-                            )
+                    changes.extend(field_changes)
+                    emit_field_changes_batch(
+                        animal_id=animal_id,
+                        animal_number=animal,
+                        company_id=company_id,
+                        user_id=created_by_or_key,
+                        changes=changes,
+                        notes=notes,
+                    )
                     
                     # Ensure new mother has events if mother_id changed
                     if mother and mother != old_values['mother_id'] and company_id:
@@ -929,12 +1028,10 @@ def update_registration(created_by_or_key: str, animal_id: int, body, company_id
                                 current_weight=mother_weight,
                                 status='ALIVE',
                                 rp_animal=rp_mother,
+                                project_by_number=True,
                             )
-                            # Project snapshot for mother after event creation
-                            project_animal_snapshot_by_number(mother, company_id)
                         except Exception as e:
-                            import logging
-                            logging.warning(f"Failed to ensure events for new mother {mother}: {e}")
+                            logger.warning(f"Failed to ensure events for new mother {mother}: {e}")
                     
                     # Ensure new father has events if father_id changed
                     if father and father != old_values['father_id'] and company_id:
@@ -945,29 +1042,16 @@ def update_registration(created_by_or_key: str, animal_id: int, body, company_id
                                 user_id=created_by_or_key,
                                 gender='MALE',
                                 status='ALIVE',
+                                project_by_number=True,
                             )
-                            # Project snapshot for father after event creation
-                            project_animal_snapshot_by_number(father, company_id)
                         except Exception as e:
-                            import logging
-                            logging.warning(f"Failed to ensure events for new father {father}: {e}")
+                            logger.warning(f"Failed to ensure events for new father {father}: {e}")
                     
                     # Emit events for mother's own animal_id when mother_weight changes
                     if mother and (mother_weight != old_values['mother_weight'] or mother != old_values['mother_id']) and company_id:
                         try:
-                            # Find mother's registration
-                            cursor = conn.execute(
-                                """
-                                SELECT id FROM registrations 
-                                WHERE animal_number = ? AND company_id = ?
-                                LIMIT 1
-                                """,
-                                (mother, company_id)
-                            )
-                            mother_reg = cursor.fetchone()
-                            
-                            if mother_reg:
-                                mother_animal_id = mother_reg[0]
+                            if mother_reg_id:
+                                mother_animal_id = mother_reg_id
                                 # Emit current_weight event for mother
                                 if mother_weight and mother_weight != old_values['mother_weight']:
                                         emit_field_change(
@@ -984,119 +1068,95 @@ def update_registration(created_by_or_key: str, animal_id: int, body, company_id
                                         # Project snapshot for mother after event emission
                                         project_animal_snapshot(mother_animal_id, company_id)
                         except Exception as e:
-                            import logging
-                            logging.warning(f"Failed to emit event for mother {mother}: {e}")
+                            logger.warning(f"Failed to emit event for mother {mother}: {e}")
                     
-                    # Step 2: Project snapshot (derived from events)
-                    project_animal_snapshot(animal_id, company_id)
+                    # Step 2: Project snapshot (derived from events); the projector returns
+                    # the state it just saved, so there is no need to read it back
+                    snapshot = project_animal_snapshot(animal_id, company_id)
                     
                     # Step 3: Project registration from snapshot (derived, for backwards compatibility)
-                    snapshot = get_snapshot(animal_id, company_id)
                     if snapshot:
                         project_registration_from_snapshot(
                             animal_id=animal_id,
                             snapshot=snapshot,
                             created_by=created_by_or_key,
-                            created_at=old_values.get('created_at', _dt.datetime.utcnow().isoformat()),
+                            created_at=old_values['created_at'],
                         )
                     
                 except Exception as e:
                     # Log but don't fail - triggers still work as backup
-                    import logging
-                    logging.warning(f"Failed to emit update events for animal {animal_id}: {e}")
+                    logger.warning(f"Failed to emit update events for animal {animal_id}: {e}")
                     
     except sqlite3.Error as e:
         raise HTTPException(status_code=500, detail=f"DB error: {e}")
+    return animal_id
 
+@with_write_lock
 def find_and_update_registration(created_by_or_key: str, body, company_id: int | None = None) -> bool:
     """Find and update a registration record by animalNumber and createdAt.
     Requires company_id - only users within the same company can update records.
     """
     # Require company_id for all updates
     if not company_id:
-        print(f"Access denied: company_id required. User={created_by_or_key} attempted update without company assignment.")
+        logger.warning("Access denied: company_id required. User=%s attempted update without company assignment.", created_by_or_key)
         return False
     
-    # Normalize animal_number to match database storage format
+    # Normalize lookup keys to match database storage format (created_at is
+    # stored verbatim, so only surrounding whitespace is dropped)
     animal_number = _normalize_text(body.animalNumber)
-    created_at = body.createdAt
+    created_at = (body.createdAt or "").strip() or None
     
-    print(f"find_and_update_registration called with: animal_number={animal_number}, created_at={created_at}, user={created_by_or_key}, company_id={company_id}")
+    logger.debug(
+        "find_and_update_registration called with: animal_number=%s, created_at=%s, user=%s, company_id=%s",
+        animal_number, created_at, created_by_or_key, company_id,
+    )
     
     if not animal_number or not created_at:
-        print("Missing animal_number or created_at")
+        logger.debug("Missing animal_number or created_at")
         return False
     
     try:
-        with conn:
-            # Multi-tenant: only users in same company can update records
-            where_clause = "animal_number = ? AND created_at = ? AND company_id = ?"
-            params = (animal_number, created_at, company_id)
-            
-            # Find the record by animalNumber and createdAt
-            # animal_number is already normalized to match database storage format
-            cursor = conn.execute(
-                f"""
-                SELECT id FROM registrations 
-                WHERE {where_clause}
-                """,
-                params
-            )
-            record = cursor.fetchone()
-            
-            if not record:
-                # Try to find if record exists but with different access
-                cursor_check = conn.execute(
-                    """
-                    SELECT id, created_by, user_key, company_id FROM registrations 
-                    WHERE animal_number = ? AND created_at = ?
-                    """,
-                    (animal_number, created_at)
-                )
-                check_record = cursor_check.fetchone()
-                if check_record:
-                    print(f"Record exists but access denied. Record user_key={check_record[2]}, created_by={check_record[1]}, company_id={check_record[3]}, requested user={created_by_or_key}, requested company_id={company_id}")
-                else:
-                    print(f"No record found in database for animal_number={animal_number}, created_at={created_at}")
-                return False
-            
-            animal_id = record[0]
-            print(f"Found record with ID: {animal_id}")
-            
-            # Update the record using the existing update_registration logic
-            from ..models import RegisterBody
-            update_body = RegisterBody(
-                animalNumber=body.animalNumber,
-                animalIdv=body.animalIdv if hasattr(body, 'animalIdv') else None,
-                motherId=body.motherId,
-                rpAnimal=body.rpAnimal,
-                rpMother=body.rpMother,
-                fatherId=body.fatherId,
-                bornDate=body.bornDate,
-                weight=body.weight,
-                currentWeight=body.currentWeight if hasattr(body, 'currentWeight') else None,
-                motherWeight=body.motherWeight,
-                weaningWeight=body.weaningWeight,
-                gender=body.gender,
-                status=body.status,
-                color=body.color,
-                notes=body.notes,
-                notesMother=body.notesMother,
-                inseminationRoundId=body.inseminationRoundId,
-                inseminationIdentifier=body.inseminationIdentifier,
-                scrotalCircumference=body.scrotalCircumference,
-                deathDate=body.deathDate if hasattr(body, 'deathDate') else None,
-                soldDate=body.soldDate if hasattr(body, 'soldDate') else None,
+        # Multi-tenant: only users in same company can update records.
+        # The core's old-values SELECT is the lookup, so the record is read once.
+        # animal_number is already normalized to match database storage format
+        animal_id = _update_registration_core(
+            created_by_or_key,
+            "animal_number = ? AND created_at = ?",
+            (animal_number, created_at),
+            body,
+            company_id,
+        )
+        logger.debug("Updated record with ID: %s", animal_id)
+        return True
+    
+    except HTTPException as e:
+        if e.status_code != 404:
+            logger.error("Error in find_and_update_registration: %s", e.detail)
+            return False
+        if not logger.isEnabledFor(logging.DEBUG):
+            return False
+        # Try to find if record exists but with different access (debug diagnostic only)
+        check_record = conn.execute(
+            """
+            SELECT id, created_by, user_key, company_id FROM registrations 
+            WHERE animal_number = ? AND created_at = ?
+            """,
+            (animal_number, created_at)
+        ).fetchone()
+        if check_record:
+            logger.debug(
+                "Record exists but access denied. Record user_key=%s, created_by=%s, company_id=%s, requested user=%s, requested company_id=%s",
+                check_record[2], check_record[1], check_record[3], created_by_or_key, company_id,
             )
-            
-            update_registration(created_by_or_key, animal_id, update_body, company_id)
-            print("Record updated successfully")
-            return True
+        else:
+            logger.debug("No record found in database for animal_number=%s, created_at=%s", animal_number, created_at)
+        return False
             
     except Exception as e:
-        print(f"Error in find_and_update_registration: {e}")
+        logger.error("Error in find_and_update_registration: %s", e)
         return False
 
+@with_write_lock
 def update_animal_by_number(
     created_by_or_key: str,
     body,
@@ -1114,8 +1174,7 @@ def update_animal_by_number(
     animal_number = _normalize_text(body.animalNumber)
     
     # Check if animal has domain events
-    existing_events = get_events_for_animal_by_number(animal_number, company_id)
-    if len(existing_events) == 0:
+    if not animal_has_events_by_number(animal_number, company_id):
         raise HTTPException(
             status_code=404,
             detail=f"Animal {animal_number} not found in domain events. Cannot update animals that don't exist."
@@ -1138,176 +1197,130 @@ def update_animal_by_number(
         'animal_idv': snapshot.get('animal_idv') if snapshot else None,
     }
     
-    # If snapshot doesn't have values, try to get from most recent event
+    # If snapshot doesn't have values, take the most recent value each field has in the events
     if not snapshot:
-        for event in reversed(existing_events):
-            if event.get('payload'):
-                payload = event['payload'] if isinstance(event['payload'], dict) else json.loads(event['payload'])
-                if old_values['current_weight'] is None and payload.get('current_weight') is not None:
-                    old_values['current_weight'] = payload.get('current_weight')
-                if old_values['notes'] is None and payload.get('notes') is not None:
-                    old_values['notes'] = payload.get('notes')
-                if old_values['status'] is None and payload.get('status') is not None:
-                    old_values['status'] = payload.get('status')
-                if old_values['color'] is None and payload.get('color') is not None:
-                    old_values['color'] = payload.get('color')
-                if old_values['rp_animal'] is None and payload.get('rp_animal') is not None:
-                    old_values['rp_animal'] = payload.get('rp_animal')
-                if old_values['notes_mother'] is None and payload.get('notes_mother') is not None:
-                    old_values['notes_mother'] = payload.get('notes_mother')
-                if old_values['animal_idv'] is None and payload.get('animal_idv') is not None:
-                    old_values['animal_idv'] = payload.get('animal_idv')
+        row = conn.execute(_BY_NUMBER_EVENT_FALLBACK_SQL, (animal_number, company_id)).fetchone()
+        old_values.update(zip(_BY_NUMBER_EVENT_FALLBACK_FIELDS, row))
     
     # Normalize new values
-    new_current_weight = None
-    if body.currentWeight is not None:
-        try:
-            new_current_weight = float(body.currentWeight)
-            if not (0 <= new_current_weight <= 10000):
-                raise HTTPException(status_code=400, detail="Current weight must be between 0 and 10000 kg")
-        except (ValueError, TypeError):
-            raise HTTPException(status_code=400, detail="Invalid current weight value")
+    new_current_weight = _parse_bounded_float(body.currentWeight, "Current weight", 10000, "kg")
     
     new_notes = _normalize_text(body.notes)
     new_status = _normalize_text(body.status)
     new_color = _normalize_text(body.color)
     new_rp_animal = _normalize_text(body.rpAnimal)
     new_notes_mother = _normalize_text(body.notesMother)
-    new_animal_idv = _normalize_text(body.animalIdv) if hasattr(body, 'animalIdv') else None
+    new_animal_idv = _normalize_text(body.animalIdv)
     
     # Validate status if provided
     if new_status and new_status not in VALID_STATUSES:
-        raise HTTPException(status_code=400, detail=f"Invalid status. Must be one of: {', '.join(VALID_STATUSES)}")
+        raise HTTPException(status_code=400, detail=_STATUS_ERR)
     
     # Emit update events for changed fields (with animal_id=None for mothers/fathers)
     animal_id = None  # Mothers/fathers don't have registration records, so animal_id is None
     
-    # Track if any events were emitted
-    events_emitted = False
-    
-    if new_current_weight is not None and new_current_weight != old_values['current_weight']:
-        emit_field_change(
-            event_type=EventType.CURRENT_WEIGHT_RECORDED,
-            animal_id=animal_id,
-            animal_number=animal_number,
-            company_id=company_id,
-            user_id=created_by_or_key,
-            field_name='current_weight',
-            old_value=str(old_values['current_weight']) if old_values['current_weight'] is not None else None,
-            new_value=str(new_current_weight),
-        )
-        events_emitted = True
-    
-    if new_notes and new_notes != old_values['notes']:
-        emit_field_change(
-            event_type=EventType.NOTES_UPDATED,
-            animal_id=animal_id,
-            animal_number=animal_number,
-            company_id=company_id,
-            user_id=created_by_or_key,
-            field_name='notes',
-            old_value=old_values['notes'],
-            new_value=new_notes,
-        )
-        events_emitted = True
-    
-    if new_status and new_status != old_values['status']:
-        emit_field_change(
-            event_type=EventType.STATUS_CHANGED,
-            animal_id=animal_id,
-            animal_number=animal_number,
-            company_id=company_id,
-            user_id=created_by_or_key,
-            field_name='status',
-            old_value=old_values['status'],
-            new_value=new_status,
-        )
-        events_emitted = True
-    
-    if new_color and new_color != old_values['color']:
-        emit_field_change(
-            event_type=EventType.COLOR_RECORDED,
-            animal_id=animal_id,
-            animal_number=animal_number,
-            company_id=company_id,
-            user_id=created_by_or_key,
-            field_name='color',
-            old_value=old_values['color'],
-            new_value=new_color,
-        )
-        events_emitted = True
-    
-    if new_rp_animal and new_rp_animal != old_values['rp_animal']:
-        emit_field_change(
-            event_type=EventType.RP_ANIMAL_UPDATED,
-            animal_id=animal_id,
-            animal_number=animal_number,
-            company_id=company_id,
-            user_id=created_by_or_key,
-            field_name='rp_animal',
-            old_value=old_values['rp_animal'],
-            new_value=new_rp_animal,
-        )
-        events_emitted = True
-    
-    if new_notes_mother and new_notes_mother != old_values['notes_mother']:
-        emit_field_change(
-            event_type=EventType.MOTHER_NOTES_UPDATED,
-            animal_id=animal_id,
-            animal_number=animal_number,
-            company_id=company_id,
-            user_id=created_by_or_key,
-            field_name='notes_mother',
-            old_value=old_values['notes_mother'],
-            new_value=new_notes_mother,
-        )
-        events_emitted = True
-    
-    if new_animal_idv and new_animal_idv != old_values['animal_idv']:
-        emit_field_change(
-            event_type=EventType.ANIMAL_IDV_UPDATED,
-            animal_id=animal_id,
-            animal_number=animal_number,
-            company_id=company_id,
-            user_id=created_by_or_key,
-            field_name='animal_idv',
-            old_value=old_values['animal_idv'],
-            new_value=new_animal_idv,
-        )
-        events_emitted = True
+    # Collect the changed fields and emit them as one batch
+    old_current_weight = old_values['current_weight']
+    changes = []
+    if new_current_weight is not None and new_current_weight != old_current_weight:
+        changes.append((
+            EventType.CURRENT_WEIGHT_RECORDED, 'current_weight',
+            str(old_current_weight) if old_current_weight is not None else None,
+            str(new_current_weight),
+        ))
+    for event_type, field_name, new_value in (
+        (EventType.NOTES_UPDATED, 'notes', new_notes),
+        (EventType.STATUS_CHANGED, 'status', new_status),
+        (EventType.COLOR_RECORDED, 'color', new_color),
+        (EventType.RP_ANIMAL_UPDATED, 'rp_animal', new_rp_animal),
+        (EventType.MOTHER_NOTES_UPDATED, 'notes_mother', new_notes_mother),
+        (EventType.ANIMAL_IDV_UPDATED, 'animal_idv', new_animal_idv),
+    ):
+        if new_value and new_value != old_values[field_name]:
+            changes.append((event_type, field_name, old_values[field_name], new_value))
+    events_emitted = emit_field_changes_batch(
+        animal_id=animal_id,
+        animal_number=animal_number,
+        company_id=company_id,
+        user_id=created_by_or_key,
+        changes=changes,
+    ) > 0
     
     # Project snapshot by animal_number after all events (incremental projection will process all new events)
     if events_emitted:
         project_animal_snapshot_by_number(animal_number, company_id)
 
-def export_rows(created_by_or_key: str, date: str | None, start: str | None, end: str | None) -> list[dict]:
-    where = ["((created_by = ?) OR (user_key = ?))", "(status IS NULL OR status != 'DELETED')"]
-    params: list = [created_by_or_key, created_by_or_key]
-    if date:
-        where.append("date(born_date) = date(?)")
-        params.append(date)
-    else:
-        if start:
-            where.append("date(born_date) >= date(?)")
-            params.append(start)
-        if end:
-            where.append("date(born_date) <= date(?)")
-            params.append(end)
-    where_sql = " AND ".join(where)
-    cur = conn.execute(
-        f"""
-        SELECT animal_number, born_date, mother_id, father_id,
-               weight, gender, animal_type, status, color, notes, notes_mother, created_at,
-               insemination_round_id, insemination_identifier, scrotal_circumference,
-               rp_animal, rp_mother, mother_weight, weaning_weight, animal_idv
-        FROM registrations
-        WHERE {where_sql}
+# Builders for SQL that varies only with the tenant clause / date-filter shape;
+# each takes a handful of distinct inputs, so the text is built once and cached.
+@lru_cache(maxsize=32)
+def _export_sql(where_clause: str, date_sql: str) -> str:
+    return f"""
+        {_EXPORT_SELECT}
+        WHERE {where_clause}{date_sql} AND (status IS NULL OR status != 'DELETED')
         ORDER BY id ASC
-        """,
-        tuple(params),
+    """
+
+
+# Legacy (per-user) export SQL for every (date, start, end) combination, built at import.
+# ?1 binds the caller once for both ownership columns; the date placeholders that
+# follow number from 2. The OR is served as a MULTI-INDEX OR over the created_by /
+# user_key born_date indexes.
+_EXPORT_QUERIES = {
+    (has_date, has_start, has_end): _export_sql(
+        "(created_by = ?1 OR user_key = ?1)",
+        _DATE_FILTER_SQL["born_date", "day" if has_date else (has_start, has_end)],
     )
-    cols = [d[0] for d in cur.description]
-    return [dict(zip(cols, r)) for r in cur.fetchall()]
+    for has_date, has_start, has_end in itertools.product((False, True), repeat=3)
+}
+
+
+@lru_cache(maxsize=8)
+def _snapshot_export_sql(date_sql: str) -> str:
+    # Same column order as EXPORT_COLUMNS
+    return f"""
+        SELECT s.animal_number, s.birth_date AS born_date, s.mother_id, s.father_id,
+               s.current_weight AS weight, s.gender, NULL AS animal_type, 
+               s.current_status AS status, s.color, s.notes, s.notes_mother,
+               s.updated_at AS created_at, s.insemination_round_id, s.insemination_identifier,
+               s.scrotal_circumference, s.rp_animal, s.rp_mother, s.mother_weight, s.weaning_weight, s.animal_idv
+        FROM animal_snapshots s
+        LEFT JOIN registrations r ON r.id = s.animal_id
+        WHERE s.company_id = ? 
+          AND (s.animal_id < 0 OR r.id IS NULL)
+          {date_sql}
+        ORDER BY s.animal_number ASC
+    """
+
+
+@lru_cache(maxsize=8)
+def _registrations_list_sql(where_clause: str) -> str:
+    return f"""
+        SELECT id, animal_number, created_at, mother_id, born_date, weight, 
+               gender, status, color, notes, notes_mother, insemination_round_id,
+               insemination_identifier, scrotal_circumference, animal_type,
+               rp_animal, rp_mother, mother_weight, weaning_weight
+        FROM registrations
+        WHERE {where_clause} AND (status IS NULL OR status != 'DELETED')
+        ORDER BY id DESC
+        LIMIT ?
+    """
+
+
+def export_rows(created_by_or_key: str, date: str | None, start: str | None, end: str | None) -> ExportRows:
+    """Export the caller's registrations as a lazily-consumed iterator of EXPORT_COLUMNS tuples.
+    The query runs immediately; rows are fetched in batches as the iterator is consumed.
+    """
+    date_params = (date,) if date else tuple(v for v in (start, end) if v)
+    read_conn = open_read_conn()
+    try:
+        cur = read_conn.execute(
+            _EXPORT_QUERIES[bool(date), bool(start), bool(end)],
+            (created_by_or_key,) + date_params,
+        )
+    except BaseException:
+        release_read_conn(read_conn)
+        raise
+    return ExportRows(read_conn, [cur])
 
 
 # Multi-tenant functions
@@ -1320,51 +1333,20 @@ def get_registrations_multi_tenant(user: dict, limit: int = 100) -> list[dict]:
         where_clause, params = get_data_filter_clause(company_id, firebase_uid)
         params.append(limit)
         
-        cursor = conn.execute(
-            f"""
-            SELECT id, animal_number, created_at, mother_id, born_date, weight, 
-                   gender, status, color, notes, notes_mother, insemination_round_id,
-                   insemination_identifier, scrotal_circumference, animal_type,
-                   rp_animal, rp_mother, mother_weight, weaning_weight, animal_idv
-            FROM registrations
-            WHERE {where_clause} AND (status IS NULL OR status != 'DELETED')
-            ORDER BY id DESC
-            LIMIT ?
-            """,
-            params
-        )
+        cursor = get_read_conn().execute(_registrations_list_sql(where_clause), params)
         
-        rows = cursor.fetchall()
-        return [
-            {
-                "id": row[0],
-                "animalNumber": row[1],
-                "createdAt": row[2],
-                "motherId": row[3],
-                "bornDate": row[4],
-                "weight": row[5],
-                "gender": row[6],
-                "status": row[7],
-                "color": row[8],
-                "notes": row[9],
-                "notesMother": row[10],
-                "inseminationRoundId": row[11],
-                "inseminationIdentifier": row[12],
-                "scrotalCircumference": row[13],
-                "animalType": row[14],
-                "rpAnimal": row[15] if len(row) > 15 else None,
-                "rpMother": row[16] if len(row) > 16 else None,
-                "motherWeight": row[17] if len(row) > 17 else None,
-                "weaningWeight": row[18] if len(row) > 18 else None
-            }
-            for row in rows
-        ]
+        keys = _REGISTRATION_LIST_KEYS
+        return [dict(zip(keys, row)) for row in cursor.fetchall()]
     except sqlite3.Error as e:
         raise HTTPException(status_code=500, detail=f"DB error: {e}")
 
 
-def export_rows_multi_tenant(user: dict, date: str = None, start: str = None, end: str = None) -> list[dict]:
-    """Export registrations with multi-tenant filtering, including mothers/fathers from snapshots"""
+def export_rows_multi_tenant(user: dict, date: str = None, start: str = None, end: str = None) -> ExportRows:
+    """Export registrations with multi-tenant filtering, including mothers/fathers from snapshots.
+    Returns a lazily-consumed iterator of EXPORT_COLUMNS tuples; both queries run immediately
+    so DB errors surface here. They run on a private connection released by ExportRows.
+    """
+    read_conn = open_read_conn()
     try:
         company_id = user.get('company_id')
         firebase_uid = user.get('firebase_uid')
@@ -1372,141 +1354,90 @@ def export_rows_multi_tenant(user: dict, date: str = None, start: str = None, en
         # Build WHERE clause and params for registrations
         where_clause, params = get_data_filter_clause(company_id, firebase_uid)
         
-        # Build date filtering conditions
-        date_conditions = ""
-        date_params = []
-        if date:
-            date_conditions = " AND date(born_date) = date(?)"
-            date_params.append(date)
-        else:
-            if start:
-                date_conditions += " AND date(born_date) >= date(?)"
-                date_params.append(start)
-            if end:
-                date_conditions += " AND date(born_date) <= date(?)"
-                date_params.append(end)
+        date_conditions, date_params = _date_filter("born_date", date, start, end)
         
         # Query registrations (existing behavior), excluding DELETED animals
-        reg_params = list(params) + date_params
-        cursor = conn.execute(
-            f"""
-            SELECT animal_number, born_date, mother_id, father_id,
-                   weight, gender, animal_type, status, color, notes, notes_mother, 
-                   created_at, insemination_round_id, insemination_identifier, 
-                   scrotal_circumference, rp_animal, rp_mother, mother_weight, weaning_weight, animal_idv
-            FROM registrations
-            WHERE {where_clause}{date_conditions} AND (status IS NULL OR status != 'DELETED')
-            ORDER BY id ASC
-            """,
-            tuple(reg_params)
-        )
-        
-        cols = [d[0] for d in cursor.description]
-        registration_rows = [dict(zip(cols, r)) for r in cursor.fetchall()]
+        reg_params = tuple(params) + date_params
+        cursors = [read_conn.execute(_export_sql(where_clause, date_conditions), reg_params)]
         
         # Query animal_snapshots for mothers/fathers (animals not in registrations)
         # Mothers/fathers have animal_id < 0 (negative hash-based ID) or animal_id not in registrations
+        # If no company_id, only return registrations (get_data_filter_clause returns "1 = 0" for no company)
         if company_id:
-            # Build date filtering for snapshots (using birth_date instead of born_date)
-            snapshot_date_conditions = ""
-            snapshot_date_params = []
-            if date:
-                snapshot_date_conditions = " AND date(birth_date) = date(?)"
-                snapshot_date_params.append(date)
-            else:
-                if start:
-                    snapshot_date_conditions += " AND date(birth_date) >= date(?)"
-                    snapshot_date_params.append(start)
-                if end:
-                    snapshot_date_conditions += " AND date(birth_date) <= date(?)"
-                    snapshot_date_params.append(end)
+            # Same date filter on snapshots (birth_date instead of born_date)
+            snapshot_date_conditions, snapshot_date_params = _date_filter("birth_date", date, start, end)
             
-            snapshot_params = [company_id] + snapshot_date_params
-            cursor = conn.execute(
-                f"""
-                SELECT animal_number, birth_date AS born_date, mother_id, father_id,
-                       current_weight AS weight, gender, NULL AS animal_type, 
-                       current_status AS status, color, notes, notes_mother,
-                       updated_at AS created_at, insemination_round_id, insemination_identifier,
-                       scrotal_circumference, rp_animal, rp_mother, mother_weight, weaning_weight, animal_idv
-                FROM animal_snapshots
-                WHERE company_id = ? 
-                  AND (animal_id < 0 OR animal_id NOT IN (SELECT id FROM registrations))
-                  {snapshot_date_conditions}
-                ORDER BY animal_number ASC
-                """,
-                tuple(snapshot_params)
-            )
-            
-            snapshot_cols = [d[0] for d in cursor.description]
-            snapshot_rows = [dict(zip(snapshot_cols, r)) for r in cursor.fetchall()]
-            
-            # Combine both result sets
-            all_rows = registration_rows + snapshot_rows
-        else:
-            # If no company_id, only return registrations (get_data_filter_clause returns "1 = 0" for no company)
-            all_rows = registration_rows
+            snapshot_params = (company_id,) + snapshot_date_params
+            cursors.append(read_conn.execute(_snapshot_export_sql(snapshot_date_conditions), snapshot_params))
         
-        return all_rows
+        # Registrations first, then snapshots
+        return ExportRows(read_conn, cursors)
     except sqlite3.Error as e:
+        release_read_conn(read_conn)
         raise HTTPException(status_code=500, detail=f"DB error: {e}")
+    except BaseException:
+        release_read_conn(read_conn)
+        raise
+
+
+@lru_cache(maxsize=8)
+def _stats_sql(where_clause: str, from_summary: bool = True) -> str:
+    """SQL for the stats scan; the tenant clause takes only a few shapes, so the text is cached.
+
+    Both variants return (gender, animal_type, count, recent_count) grouped by gender/animal_type.
+    """
+    if from_summary:
+        return f"""
+            SELECT gender, animal_type, SUM(count),
+                   SUM(CASE WHEN bucket_date >= date('now', '-30 days') THEN count ELSE 0 END)
+            FROM registration_stats
+            WHERE {where_clause}
+            GROUP BY gender, animal_type
+        """
+    return f"""
+        SELECT gender, animal_type, COUNT(*),
+               SUM(CASE WHEN date(created_at) >= date('now', '-30 days') THEN 1 ELSE 0 END)
+        FROM registrations
+        WHERE {where_clause}
+        GROUP BY gender, animal_type
+    """
 
 
 def get_registration_stats_multi_tenant(user: dict) -> dict:
-    """Get registration statistics with multi-tenant filtering"""
+    """Get registration statistics with multi-tenant filtering.
+
+    Reads the trigger-maintained registration_stats summary table (see db.py)
+    in a single grouped scan and folds the totals in Python; falls back to one
+    grouped scan of registrations if the summary table is unavailable.
+    """
     try:
         company_id = user.get('company_id')
         firebase_uid = user.get('firebase_uid')
         
+        # registration_stats shares the company_id column, so the tenant filter applies as-is
         where_clause, params = get_data_filter_clause(company_id, firebase_uid)
+        try:
+            cursor = get_read_conn().execute(_stats_sql(where_clause), params)
+        except sqlite3.OperationalError:
+            # Summary table missing (its migration failed): same shape, one scan of registrations
+            cursor = get_read_conn().execute(_stats_sql(where_clause, from_summary=False), params)
         
-        # Total registrations
-        cursor = conn.execute(
-            f"SELECT COUNT(*) FROM registrations WHERE {where_clause}",
-            params
-        )
-        total_registrations = cursor.fetchone()[0]
-        
-        # By gender
-        cursor = conn.execute(
-            f"""
-            SELECT gender, COUNT(*) 
-            FROM registrations 
-            WHERE {where_clause} AND gender IS NOT NULL
-            GROUP BY gender
-            """,
-            params
-        )
-        gender_stats = dict(cursor.fetchall())
-        
-        # By animal type
-        cursor = conn.execute(
-            f"""
-            SELECT animal_type, COUNT(*) 
-            FROM registrations 
-            WHERE {where_clause} AND animal_type IS NOT NULL
-            GROUP BY animal_type
-            """,
-            params
-        )
-        animal_type_stats = dict(cursor.fetchall())
-        
-        # Recent registrations (last 30 days)
-        cursor = conn.execute(
-            f"""
-            SELECT COUNT(*) 
-            FROM registrations 
-            WHERE {where_clause} 
-            AND date(created_at) >= date('now', '-30 days')
-            """,
-            params
-        )
-        recent_registrations = cursor.fetchone()[0]
+        total_registrations = 0
+        recent_registrations = 0
+        gender_stats: dict = {}
+        animal_type_stats: dict = {}
+        for gender, animal_type, count, recent in cursor.fetchall():
+            total_registrations += count
+            recent_registrations += recent
+            if gender:
+                gender_stats[gender] = gender_stats.get(gender, 0) + count
+            if animal_type:
+                animal_type_stats[animal_type] = animal_type_stats.get(animal_type, 0) + count
         
         return {
             "total_registrations": total_registrations,
-            "gender_stats": gender_stats,
-            "animal_type_stats": animal_type_stats,
+            "gender_stats": {k: v for k, v in sorted(gender_stats.items()) if v > 0},
+            "animal_type_stats": {k: v for k, v in sorted(animal_type_stats.items()) if v > 0},
             "recent_registrations": recent_registrations,
             "company_id": company_id,
             "is_company_data": company_id is not None
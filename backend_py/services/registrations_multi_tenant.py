@@ -4,61 +4,117 @@ This shows how to modify existing services to use company-based filtering
 """
 
 import sqlite3
-from typing import Optional, List, Dict, Tuple
+from functools import lru_cache
+from typing import Optional, List, Dict, Tuple, Iterator
 from fastapi import HTTPException
-from ..db import conn
+from ..db import conn, get_read_conn, open_read_conn, release_read_conn, with_write_lock
 from ..models import RegisterBody, UpdateBody
 from .auth_service import get_data_filter_clause
 
+# Rows fetched per round trip when streaming exports
+_EXPORT_BATCH_SIZE = 1000
 
+# Response keys of get_registrations_multi_tenant, in SELECT order
+_REGISTRATION_KEYS_MT = (
+    "id", "animalNumber", "createdAt", "motherId", "bornDate", "weight",
+    "gender", "status", "color", "notes", "notesMother", "inseminationRoundId",
+    "inseminationIdentifier", "scrotalCircumference", "animalType",
+)
+
+# Columns selected by export_rows_multi_tenant, in SELECT order
+_EXPORT_COLS_MT = (
+    "animal_number", "born_date", "mother_id", "father_id",
+    "weight", "gender", "animal_type", "status", "color", "notes", "notes_mother",
+    "created_at", "insemination_round_id", "insemination_identifier",
+    "scrotal_circumference", "rp_animal", "rp_mother", "mother_weight",
+)
+
+
+_INSERT_REGISTRATION_SQL = """
+    INSERT INTO registrations (
+        animal_number, created_at, user_key, created_by, mother_id, 
+        born_date, weight, gender, status, color, notes, notes_mother,
+        insemination_round_id, insemination_identifier, scrotal_circumference,
+        animal_type, company_id
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+_INSERT_REGISTRATION_RETURNING_SQL = _INSERT_REGISTRATION_SQL + "    RETURNING id\n"
+_INSERT_EVENT_STATE_SQL = """
+    INSERT INTO events_state (
+        animal_id, animal_number, event_type, user_id, event_date, notes, company_id
+    ) VALUES (?, ?, ?, ?, ?, ?, ?)
+"""
+
+# SQL builders. get_data_filter_clause yields only a couple of tenant clauses and
+# the export has four date shapes, so each text is built once and then reused
+# verbatim, which also keeps sqlite3's statement cache hitting.
+@lru_cache(maxsize=8)
+def _list_sql(where_clause: str) -> str:
+    return f"""
+        SELECT id, animal_number, created_at, mother_id, born_date, weight, 
+               gender, status, color, notes, notes_mother, insemination_round_id,
+               insemination_identifier, scrotal_circumference, animal_type
+        FROM registrations
+        WHERE {where_clause}
+        ORDER BY id DESC
+        LIMIT ?
+    """
+
+
+@lru_cache(maxsize=32)
+def _export_sql(where_clause: str, date_shape) -> str:
+    # date(born_date) also matches values stored with a time part; the
+    # idx_reg_company_born_day expression index keeps it a seek
+    if date_shape == "day":
+        where_clause += " AND date(born_date) = date(?)"
+    else:
+        has_start, has_end = date_shape
+        if has_start:
+            where_clause += " AND date(born_date) >= date(?)"
+        if has_end:
+            where_clause += " AND date(born_date) <= date(?)"
+    return f"""
+        SELECT {', '.join(_EXPORT_COLS_MT)}
+        FROM registrations
+        WHERE {where_clause}
+        ORDER BY id ASC
+    """
+
+
+@lru_cache(maxsize=8)
+def _stats_sql(where_clause: str) -> str:
+    # Excludes DELETED animals from all stats
+    return f"""
+        SELECT gender, animal_type, COUNT(*),
+               SUM(CASE WHEN date(created_at) >= date('now', '-30 days') THEN 1 ELSE 0 END)
+        FROM registrations
+        WHERE {where_clause} AND (status IS NULL OR status != 'DELETED')
+        GROUP BY gender, animal_type
+    """
+
+
+@with_write_lock
 def insert_registration_multi_tenant(user: Dict, body: RegisterBody) -> int:
     """
     Insert registration with multi-tenant support
     user: User dict from auth_service.authenticate_user()
+    Relies on the WAL + synchronous=NORMAL pragmas set when db.py opens conn,
+    so the commit doesn't fsync per statement and export/stats readers don't
+    block it.
     """
     try:
         company_id = user.get('company_id')
         firebase_uid = user.get('firebase_uid')
         
         with conn:
-            cursor = conn.execute(
-                """
-                INSERT INTO registrations (
-                    animal_number, created_at, user_key, created_by, mother_id, 
-                    born_date, weight, gender, status, color, notes, notes_mother,
-                    insemination_round_id, insemination_identifier, scrotal_circumference,
-                    animal_type, company_id
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """,
-                (
-                    body.animalNumber,
-                    body.createdAt or sqlite3.datetime.datetime.now().isoformat(),
-                    None,  # user_key for legacy compatibility
-                    firebase_uid,
-                    body.motherId,
-                    body.bornDate,
-                    body.weight,
-                    body.gender,
-                    body.status,
-                    body.color,
-                    body.notes,
-                    body.notesMother,
-                    body.inseminationRoundId,
-                    body.inseminationIdentifier,
-                    body.scrotalCircumference,
-                    _get_animal_type(body.gender),
-                    company_id
-                )
-            )
-            record_id = cursor.lastrowid
+            record_id = conn.execute(
+                _INSERT_REGISTRATION_RETURNING_SQL,
+                _registration_row(body, firebase_uid, company_id),
+            ).fetchone()[0]
             
             # Create event record
             conn.execute(
-                """
-                INSERT INTO events_state (
-                    animal_id, animal_number, event_type, user_id, event_date, notes, company_id
-                ) VALUES (?, ?, ?, ?, ?, ?, ?)
-                """,
+                _INSERT_EVENT_STATE_SQL,
                 (
                     record_id,
                     body.animalNumber,
@@ -86,41 +142,9 @@ def get_registrations_multi_tenant(user: Dict, limit: int = 100) -> List[Dict]:
         where_clause, params = get_data_filter_clause(company_id, firebase_uid)
         params.append(limit)
         
-        cursor = conn.execute(
-            f"""
-            SELECT id, animal_number, created_at, mother_id, born_date, weight, 
-                   gender, status, color, notes, notes_mother, insemination_round_id,
-                   insemination_identifier, scrotal_circumference, animal_type,
-                   rp_animal, rp_mother, mother_weight
-            FROM registrations
-            WHERE {where_clause}
-            ORDER BY id DESC
-            LIMIT ?
-            """,
-            params
-        )
+        cursor = get_read_conn().execute(_list_sql(where_clause), params)
         
-        rows = cursor.fetchall()
-        return [
-            {
-                "id": row[0],
-                "animalNumber": row[1],
-                "createdAt": row[2],
-                "motherId": row[3],
-                "bornDate": row[4],
-                "weight": row[5],
-                "gender": row[6],
-                "status": row[7],
-                "color": row[8],
-                "notes": row[9],
-                "notesMother": row[10],
-                "inseminationRoundId": row[11],
-                "inseminationIdentifier": row[12],
-                "scrotalCircumference": row[13],
-                "animalType": row[14]
-            }
-            for row in rows
-        ]
+        return [dict(zip(_REGISTRATION_KEYS_MT, row)) for row in cursor.fetchall()]
     except sqlite3.Error as e:
         raise HTTPException(status_code=500, detail=f"DB error: {e}")
 
@@ -130,44 +154,76 @@ def export_rows_multi_tenant(
     date: str | None = None, 
     start: str | None = None, 
     end: str | None = None
-) -> List[Dict]:
+) -> Iterator[Dict]:
     """
-    Export registrations with multi-tenant filtering
+    Export registrations with multi-tenant filtering.
+    The query runs immediately, on a private read connection; rows are fetched in
+    batches of _EXPORT_BATCH_SIZE as the returned iterator is consumed, so the full
+    result is never held in memory.
     """
+    read_conn = open_read_conn()
     try:
         company_id = user.get('company_id')
         firebase_uid = user.get('firebase_uid')
         
         where_clause, params = get_data_filter_clause(company_id, firebase_uid)
         
+        # date wins over start/end
         if date:
-            where_clause += " AND date(born_date) = date(?)"
+            date_shape = "day"
             params.append(date)
         else:
-            if start:
-                where_clause += " AND date(born_date) >= date(?)"
-                params.append(start)
-            if end:
-                where_clause += " AND date(born_date) <= date(?)"
-                params.append(end)
+            date_shape = (bool(start), bool(end))
+            params.extend(value for value in (start, end) if value)
         
-        cursor = conn.execute(
-            f"""
-            SELECT animal_number, born_date, mother_id, father_id,
-                   weight, gender, animal_type, status, color, notes, notes_mother, 
-                   created_at, insemination_round_id, insemination_identifier, 
-                   scrotal_circumference, rp_animal, rp_mother, mother_weight
-            FROM registrations
-            WHERE {where_clause}
-            ORDER BY id ASC
-            """,
-            tuple(params)
-        )
+        cursor = read_conn.execute(_export_sql(where_clause, date_shape), tuple(params))
         
-        cols = [d[0] for d in cursor.description]
-        return [dict(zip(cols, r)) for r in cursor.fetchall()]
+        return _iter_export_dicts(read_conn, cursor)
     except sqlite3.Error as e:
+        release_read_conn(read_conn)
         raise HTTPException(status_code=500, detail=f"DB error: {e}")
+    except BaseException:
+        release_read_conn(read_conn)
+        raise
+
+
+def _iter_export_dicts(read_conn: sqlite3.Connection, cursor: sqlite3.Cursor) -> Iterator[Dict]:
+    """Yield export rows as dicts, fetching _EXPORT_BATCH_SIZE rows at a time.
+    read_conn is released once the rows run out or the iterator is closed early.
+    """
+    try:
+        while True:
+            rows = cursor.fetchmany(_EXPORT_BATCH_SIZE)
+            if not rows:
+                break
+            for r in rows:
+                yield dict(zip(_EXPORT_COLS_MT, r))
+    finally:
+        cursor.close()
+        release_read_conn(read_conn)
+
+
+def _registration_row(body: RegisterBody, firebase_uid: str, company_id: Optional[int]) -> tuple:
+    """Parameters for _INSERT_REGISTRATION_SQL."""
+    return (
+        body.animalNumber,
+        body.createdAt or sqlite3.datetime.datetime.now().isoformat(),
+        None,  # user_key for legacy compatibility
+        firebase_uid,
+        body.motherId,
+        body.bornDate,
+        body.weight,
+        body.gender,
+        body.status,
+        body.color,
+        body.notes,
+        body.notesMother,
+        body.inseminationRoundId,
+        body.inseminationIdentifier,
+        body.scrotalCircumference,
+        _get_animal_type(body.gender),
+        company_id,
+    )
 
 
 def _get_animal_type(gender: str) -> int:
@@ -188,51 +244,20 @@ def get_registration_stats_multi_tenant(user: Dict) -> Dict:
         firebase_uid = user.get('firebase_uid')
         
         where_clause, params = get_data_filter_clause(company_id, firebase_uid)
-        # Exclude DELETED animals from all stats
-        deleted_filter = "AND (status IS NULL OR status != 'DELETED')"
-        
-        # Total registrations (excluding DELETED)
-        cursor = conn.execute(
-            f"SELECT COUNT(*) FROM registrations WHERE {where_clause} {deleted_filter}",
-            params
-        )
-        total_registrations = cursor.fetchone()[0]
-        
-        # By gender (excluding DELETED)
-        cursor = conn.execute(
-            f"""
-            SELECT gender, COUNT(*) 
-            FROM registrations 
-            WHERE {where_clause} AND gender IS NOT NULL {deleted_filter}
-            GROUP BY gender
-            """,
-            params
-        )
-        gender_stats = dict(cursor.fetchall())
-        
-        # By animal type (excluding DELETED)
-        cursor = conn.execute(
-            f"""
-            SELECT animal_type, COUNT(*) 
-            FROM registrations 
-            WHERE {where_clause} AND animal_type IS NOT NULL {deleted_filter}
-            GROUP BY animal_type
-            """,
-            params
-        )
-        animal_type_stats = dict(cursor.fetchall())
         
-        # Recent registrations (last 30 days, excluding DELETED)
-        cursor = conn.execute(
-            f"""
-            SELECT COUNT(*) 
-            FROM registrations 
-            WHERE {where_clause} {deleted_filter}
-            AND date(created_at) >= date('now', '-30 days')
-            """,
-            params
-        )
-        recent_registrations = cursor.fetchone()[0]
+        # One grouped scan (excluding DELETED); the totals are folded in Python
+        cursor = get_read_conn().execute(_stats_sql(where_clause), params)
+        total_registrations = 0
+        recent_registrations = 0
+        gender_stats = {}
+        animal_type_stats = {}
+        for gender, animal_type, count, recent in cursor.fetchall():
+            total_registrations += count
+            recent_registrations += recent
+            if gender is not None:
+                gender_stats[gender] = gender_stats.get(gender, 0) + count
+            if animal_type is not None:
+                animal_type_stats[animal_type] = animal_type_stats.get(animal_type, 0) + count
         
         return {
             "total_registrations": total_registrations,
@@ -10,9 +10,10 @@ import re
 import datetime as _dt
 from typing import Dict, Optional
 from fastapi import HTTPException, UploadFile
-from ..db import conn
-from .registrations import _normalize_text, VALID_GENDERS, VALID_STATUSES, VALID_COLORS, _auto_assign_insemination_round_id
+from ..db import conn, write_lock
+from .registrations import _normalize_text, VALID_GENDERS, VALID_STATUSES, VALID_COLORS, GENDER_TO_ANIMAL_TYPE, _auto_assign_insemination_round_id
 from .inseminations import _validate_date
+from .registration_projector import generate_short_id
 
 
 def clean_mother_id(mother_id: str) -> str:
@@ -221,7 +222,7 @@ async def upload_registrations_from_file(
     validated_company_ids = {}
     
     try:
-        with conn:
+        with write_lock, conn:
             for index, row in df.iterrows():
                 try:
                     # Extract company_id
@@ -332,11 +333,7 @@ async def upload_registrations_from_file(
                             gender = 'UNKNOWN'
                     
                     # Determine animal_type based on gender
-                    animal_type = None
-                    if gender == 'FEMALE':
-                        animal_type = 1  # Cow
-                    elif gender == 'MALE':
-                        animal_type = 2  # Bull
+                    animal_type = GENDER_TO_ANIMAL_TYPE.get(gender)
                     
                     # Extract and normalize status (default to ALIVE)
                     status = 'ALIVE'
@@ -402,7 +399,7 @@ async def upload_registrations_from_file(
                             mother_id, father_id, born_date, weight, gender, animal_type, status, color, notes,
                             short_id, rp_mother, weaning_weight, insemination_round_id
                         )
-                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, substr(replace(hex(randomblob(16)), 'E', ''), 1, 10), ?, ?, ?)
+                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
                         """,
                         (
                             animal_number,
@@ -419,6 +416,7 @@ async def upload_registrations_from_file(
                             status,
                             color,
                             notes,
+                            generate_short_id(),
                             rp_mother,
                             weaning_weight,
                             insemination_round_id,
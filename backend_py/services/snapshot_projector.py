@@ -16,7 +16,7 @@ import logging
 import sqlite3
 from datetime import datetime
 from typing import Dict, Optional, Any, List, Callable
-from ..db import conn
+from ..db import conn, commit_writes, with_write_lock
 from ..events.event_types import EventType
 
 logger = logging.getLogger(__name__)
@@ -369,6 +369,7 @@ def build_snapshot_from_events(events: List[Dict[str, Any]]) -> Dict[str, Any]:
     return snapshot
 
 
+@with_write_lock
 def upsert_snapshot(animal_id: int, snapshot: Dict[str, Any]) -> None:
     """
     Insert or update an animal snapshot.
@@ -449,9 +450,10 @@ def upsert_snapshot(animal_id: int, snapshot: Dict[str, Any]) -> None:
             now,
         )
     )
-    conn.commit()
+    commit_writes()
 
 
+@with_write_lock
 def _upsert_snapshot_direct(animal_id: int, snapshot: Dict[str, Any]) -> None:
     """
     Insert or update snapshot directly, bypassing foreign key constraints.
@@ -503,7 +505,7 @@ def _upsert_snapshot_direct(animal_id: int, snapshot: Dict[str, Any]) -> None:
             now,
         )
     )
-    conn.commit()
+    commit_writes()
 
 
 def project_animal_snapshot_incremental(animal_id: int, company_id: int) -> Dict[str, Any]:
@@ -597,6 +599,7 @@ def project_animal_snapshot_incremental(animal_id: int, company_id: int) -> Dict
     return snapshot
 
 
+@with_write_lock
 def project_animal_snapshot(animal_id: int, company_id: int) -> Dict[str, Any]:
     """
     Rebuild snapshot for a single animal from its events.
@@ -613,6 +616,7 @@ def project_animal_snapshot(animal_id: int, company_id: int) -> Dict[str, Any]:
     return project_animal_snapshot_incremental(animal_id, company_id)
 
 
+@with_write_lock
 def project_company_snapshots(company_id: int) -> int:
     """
     Rebuild all snapshots for a company.
@@ -647,6 +651,7 @@ def project_company_snapshots(company_id: int) -> int:
     return count
 
 
+@with_write_lock
 def project_all_snapshots() -> int:
     """
     Full rebuild of all snapshots across all companies.
@@ -674,6 +679,7 @@ def project_all_snapshots() -> int:
     return total_count
 
 
+@with_write_lock
 def process_pending_events(batch_size: int = 100) -> int:
     """
     Process events since last projection for incremental updates.
@@ -887,6 +893,7 @@ def project_animal_snapshot_by_number_incremental(animal_number: str, company_id
     return snapshot
 
 
+@with_write_lock
 def project_animal_snapshot_by_number(animal_number: str, company_id: int) -> Dict[str, Any]:
     """
     Rebuild snapshot for an animal identified by animal_number (e.g., mothers without registration).
@@ -6,9 +6,10 @@ Handles user creation, company assignment, and role management
 import sqlite3
 from typing import Optional, Dict, List
 from fastapi import HTTPException
-from ..db import conn
+from ..db import conn, with_write_lock
 
 
+@with_write_lock
 def get_or_create_user(firebase_uid: str, email: str, display_name: str = None) -> Dict:
     """
     Get existing user or create new user from Firebase Auth data
@@ -117,6 +118,7 @@ def get_or_create_user(firebase_uid: str, email: str, display_name: str = None)
         raise HTTPException(status_code=500, detail=f"Database error: {e}")
 
 
+@with_write_lock
 def assign_user_to_company(user_id: int, company_id: int) -> bool:
     """Assign a user to a company"""
     try:
@@ -130,6 +132,7 @@ def assign_user_to_company(user_id: int, company_id: int) -> bool:
         raise HTTPException(status_code=500, detail=f"Database error: {e}")
 
 
+@with_write_lock
 def create_company(name: str, description: str = None) -> int:
     """Create a new company and return its ID"""
     try:
@@ -185,6 +188,7 @@ def get_company_users(company_id: int) -> List[Dict]:
         raise HTTPException(status_code=500, detail=f"Database error: {e}")
 
 
+@with_write_lock
 def update_user_role(user_id: int, role: str) -> bool:
     """Update user role (admin, manager, viewer)"""
     try:
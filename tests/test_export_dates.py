@@ -0,0 +1,42 @@
+from backend_py.db import conn
+from backend_py.models import RegisterBody
+from backend_py.services import registrations
+
+USER = {"company_id": 1, "firebase_uid": "dates-user"}
+
+
+def _insert(animal_number: str, born_date, company_id: int) -> None:
+    registrations.insert_registration("dates-user", RegisterBody(animalNumber=animal_number, gender="male"), company_id)
+    # Older rows weren't normalized on write; store the value as-is, bypassing validation
+    conn.execute(
+        "UPDATE registrations SET born_date = ? WHERE animal_number = ? AND company_id = ?",
+        (born_date, animal_number, company_id),
+    )
+    conn.commit()
+
+
+def _exported(**filters) -> set:
+    return {row[0] for row in registrations.export_rows_multi_tenant(USER, **filters) if row[0].startswith("DT")}
+
+
+def test_dated_exports_match_non_iso_born_dates(company_id):
+    _insert("DT-ISO", "2024-03-01", company_id)
+    _insert("DT-TIME", "2024-03-01T10:00:00", company_id)
+    _insert("DT-SPACE", "2024-03-01 08:30", company_id)
+    _insert("DT-JULIAN", 2460370.5, company_id)  # 2024-03-01 as a Julian day number
+    _insert("DT-NEXT", "2024-03-02T00:00:00", company_id)
+
+    assert _exported(date="2024-03-01") == {"DT-ISO", "DT-TIME", "DT-SPACE", "DT-JULIAN"}
+    assert _exported(start="2024-03-01", end="2024-03-01") == {"DT-ISO", "DT-TIME", "DT-SPACE", "DT-JULIAN"}
+    assert _exported(start="2024-03-02") == {"DT-NEXT"}
+    assert _exported(end="2024-03-01") == {"DT-ISO", "DT-TIME", "DT-SPACE", "DT-JULIAN"}
+
+
+def test_dated_export_filter_uses_the_expression_index(company_id):
+    sql, params = registrations._date_filter("born_date", "2024-03-01", None, None)
+
+    plan = conn.execute(
+        f"EXPLAIN QUERY PLAN SELECT id FROM registrations WHERE company_id = ?{sql}", (company_id, *params)
+    ).fetchall()
+
+    assert any("idx_reg_company_born_day" in row[-1] for row in plan)
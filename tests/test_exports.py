@@ -0,0 +1,40 @@
+import sqlite3
+
+import pytest
+
+from backend_py.models import RegisterBody
+from backend_py.routes.registrations import _export_response
+from backend_py.services import registrations
+
+USER = {"company_id": 1, "firebase_uid": "export-user"}
+
+
+def test_closing_an_unstarted_export_releases_its_connection(company_id):
+    rows = registrations.export_rows_multi_tenant(USER)
+    read_conn = rows._read_conn
+
+    rows.close()
+
+    with pytest.raises(sqlite3.ProgrammingError):
+        read_conn.execute("SELECT 1")
+    rows.close()  # idempotent
+
+
+def test_export_response_closes_rows_in_the_background(company_id):
+    rows = registrations.export_rows_multi_tenant(USER)
+
+    response = _export_response(rows, "csv")
+
+    assert response.background is not None and response.background.func == rows.close
+
+
+def test_suspended_export_does_not_pin_other_reads(company_id):
+    registrations.insert_registration("export-user", RegisterBody(animalNumber="EXP1", gender="male"), company_id)
+    rows = registrations.export_rows_multi_tenant(USER)
+    next(rows)
+    before = registrations.get_registration_stats_multi_tenant(USER)["total_registrations"]
+
+    registrations.insert_registration("export-user", RegisterBody(animalNumber="EXP2", gender="male"), company_id)
+
+    assert registrations.get_registration_stats_multi_tenant(USER)["total_registrations"] == before + 1
+    rows.close()
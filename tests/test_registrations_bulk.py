@@ -0,0 +1,21 @@
+from backend_py.db import conn
+from backend_py.models import RegisterBody
+from backend_py.services import registrations
+
+
+def test_legacy_bulk_insert_returns_ids_in_body_order_across_chunks():
+    count = registrations._BULK_INSERT_CHUNK * 2 + 5
+    bodies = [RegisterBody(animalNumber=f"BK{i}") for i in range(count)]
+
+    ids = registrations.insert_registrations_bulk("bulk-key", bodies, None)
+
+    assert len(set(ids)) == count
+    numbers = [
+        conn.execute("SELECT animal_number FROM registrations WHERE id = ?", (record_id,)).fetchone()[0]
+        for record_id in ids
+    ]
+    assert numbers == [f"BK{i}" for i in range(count)]
+
+
+def test_legacy_bulk_insert_with_no_bodies():
+    assert registrations.insert_registrations_bulk("bulk-key", [], None) == []
@@ -0,0 +1,45 @@
+import pytest
+from fastapi import HTTPException
+
+from backend_py.db import conn
+from backend_py.services import registrations
+from backend_py.services.inseminations_ids import delete_insemination_id
+
+
+@pytest.fixture
+def round_2023(company_id):
+    conn.execute(
+        "INSERT OR IGNORE INTO inseminations_ids (insemination_round_id, initial_date, end_date, company_id) "
+        "VALUES ('2023RC', '2023-01-01', '2023-02-01', ?)",
+        (company_id,),
+    )
+    conn.commit()
+    registrations.invalidate_round_cache()
+
+
+def test_round_lookup_is_cached(round_2023, company_id):
+    assert registrations._auto_assign_insemination_round_id("2024-03-01", company_id) == "2023RC"
+    assert registrations._lookup_round_id.cache_info().currsize == 1
+
+
+def test_failed_writer_still_invalidates(round_2023, company_id):
+    registrations._auto_assign_insemination_round_id("2024-03-01", company_id)
+
+    with pytest.raises(HTTPException):
+        delete_insemination_id("NO-SUCH-ROUND", None)
+
+    assert registrations._lookup_round_id.cache_info().currsize == 0
+
+
+def test_cached_round_expires_after_ttl(round_2023, company_id, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(registrations.time, "monotonic", lambda: now[0])
+    registrations._auto_assign_insemination_round_id("2024-03-01", company_id)
+
+    # Another worker changes the round; this process's cache isn't told
+    conn.execute("DELETE FROM inseminations_ids WHERE insemination_round_id = '2023RC'")
+    conn.commit()
+    assert registrations._auto_assign_insemination_round_id("2024-03-01", company_id) == "2023RC"
+
+    now[0] += registrations._ROUND_CACHE_TTL_SECONDS
+    assert registrations._auto_assign_insemination_round_id("2024-03-01", company_id) != "2023RC"
@@ -0,0 +1,86 @@
+import threading
+import time
+
+import pytest
+from fastapi import HTTPException
+
+from backend_py.db import conn
+from backend_py.models import InseminationBody, RegisterBody
+from backend_py.services import registrations
+from backend_py.services.inseminations import insert_insemination
+
+
+def _count(sql: str, params: tuple) -> int:
+    return conn.execute(sql, params).fetchone()[0]
+
+
+def _run_insemination_during_batch(monkeypatch, prefix: str, fail_batch: bool) -> list:
+    """Start a registration batch and, once it has written its first row, insert an
+    insemination from another thread. Returns the errors raised by either thread.
+    """
+    in_batch = threading.Event()
+    real_short_id = registrations.generate_short_id
+    calls = []
+
+    def slow_short_id():
+        calls.append(1)
+        if len(calls) == 2:
+            # The first registration is written but not committed; keep the batch
+            # open long enough for the other thread to try to write
+            in_batch.set()
+            time.sleep(0.3)
+        elif len(calls) == 3 and fail_batch:
+            raise HTTPException(status_code=500, detail="boom")
+        return real_short_id()
+
+    monkeypatch.setattr(registrations, "generate_short_id", slow_short_id)
+    errors = []
+
+    def batch():
+        try:
+            registrations.insert_registrations_bulk(
+                "u1", [RegisterBody(animalNumber=f"{prefix}{i}", gender="male") for i in range(3)], 1
+            )
+        except Exception as e:
+            errors.append(e)
+
+    def insemination():
+        in_batch.wait(5)
+        try:
+            insert_insemination(
+                "u1",
+                InseminationBody(
+                    inseminationIdentifier=f"{prefix}-INS",
+                    inseminationRoundId="2024",
+                    motherId=f"{prefix}-MOTHER",
+                    motherVisualId=f"{prefix}-M",
+                    inseminationDate="2024-01-10",
+                ),
+                1,
+            )
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=batch), threading.Thread(target=insemination)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(10)
+    return errors
+
+
+def test_insemination_during_registration_batch_both_land(monkeypatch, company_id):
+    errors = _run_insemination_during_batch(monkeypatch, "WL", fail_batch=False)
+
+    assert errors == []
+    assert _count("SELECT COUNT(*) FROM registrations WHERE animal_number LIKE 'WL%' AND company_id = ?", (company_id,)) == 3
+    assert _count("SELECT COUNT(*) FROM inseminations WHERE insemination_identifier = 'WL-INS'", ()) == 1
+
+
+def test_insemination_does_not_commit_a_failing_registration_batch(monkeypatch, company_id):
+    errors = _run_insemination_during_batch(monkeypatch, "WF", fail_batch=True)
+
+    assert len(errors) == 1 and isinstance(errors[0], HTTPException)
+    # The batch rolled back as a whole; the insemination's commit didn't persist half of it
+    assert _count("SELECT COUNT(*) FROM registrations WHERE animal_number LIKE 'WF%' AND company_id = ?", (company_id,)) == 0
+    assert _count("SELECT COUNT(*) FROM inseminations WHERE insemination_identifier = 'WF-INS'", ()) == 1